@@ -0,0 +1,332 @@
+"""Auth hot paths: in-process timings of lib/jwt.py and lib/utils.py, then
+p50/p95/p99 latency and sustained RPS of /login, /logout, /refresh and /me
+against a running auth service.
+
+    docker compose -f docker-compose-infra-dev.yaml up -d postgres redis broker-1 ...
+    cd app && PYTHONPATH=. python bench/auth_bench.py --spawn \\
+        --bcrypt-cost 12 --access-ttl 60 --out bench/auth_baseline.json
+    # later, after a change:
+    PYTHONPATH=. python bench/auth_bench.py --spawn --baseline bench/auth_baseline.json
+
+--spawn starts the service with uvicorn from services/auth, with
+BCRYPT_COST and JWT_*_EXPIRE_SECONDS set from the flags and its own schema
+(DB_SCHEMA=auth_bench); the remaining settings come from the environment.
+Without it, --url must point at a service already started with the same
+parameters. --lib-only skips the HTTP part. The /logout phase consumes
+the sessions created by the /login phase. With --baseline the run exits
+with status 1 if a figure is more than --tolerance worse than the
+baseline. In-process timings compare the median of --repeat runs, and a
+difference only counts once it also exceeds the spread between the
+baseline's runs and the --floor-us absolute floor. Latencies likewise have
+to move by more than --floor-ms.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import uuid
+
+import httpx
+from lib.jwt import JWTManager, JWTService, RevocationFilter, TokenCache
+from lib.utils import hash_password, verify_password
+
+PASSWORD = "bench-password"
+SERVICE = os.path.join(os.path.dirname(__file__), "..", "services", "auth")
+
+
+def per_op(fn, number: int, repeat: int) -> dict:
+    # Median and every run, in microseconds per call.
+    runs = [t / number * 1e6 for t in timeit.repeat(fn, number=number, repeat=repeat)]
+    return {"us_per_op": statistics.median(runs), "runs": runs}
+
+
+def bench_lib(args) -> dict:
+    manager = JWTManager(
+        redis=None,
+        access_token_ttl=args.access_ttl,
+        refresh_token_ttl=args.refresh_ttl,
+    )
+    token = manager.claim_tokens(sub=str(uuid.uuid4()))["access_token"]
+    uncached = JWTService()
+    cached = JWTService(cache=TokenCache())
+    revocations = RevocationFilter()
+    for _ in range(10000):
+        revocations.add(str(uuid.uuid4()))
+    hashed = hash_password(PASSWORD, args.bcrypt_cost)
+    verify = dict(issuer="auth.service", audience="service")
+    repeat = args.repeat
+
+    results = {
+        "claim_tokens": per_op(lambda: manager.claim_tokens(sub="bench"), 2000, repeat),
+        "verify_token": per_op(
+            lambda: uncached.verify_token(token, **verify), 2000, repeat
+        ),
+        "verify_token_cached": per_op(
+            lambda: cached.verify_token(token, **verify), 20000, repeat
+        ),
+        "revocation_check": per_op(lambda: "bench" in revocations, 20000, repeat),
+        "hash_password": per_op(
+            lambda: hash_password(PASSWORD, args.bcrypt_cost), 3, repeat
+        ),
+        "verify_password": per_op(lambda: verify_password(PASSWORD, hashed), 3, repeat),
+    }
+    print(f"{'function':<24} {'us/op':>12} {'spread':>10}")
+    for name, result in results.items():
+        spread = max(result["runs"]) - min(result["runs"])
+        print(f"{name:<24} {result['us_per_op']:>12.1f} {spread:>10.1f}")
+    print()
+    return results
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    pick = lambda p: (
+        latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+        if latencies
+        else None
+    )
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pick(0.5),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+    }
+
+
+async def phase(name: str, args, step) -> dict:
+    # Runs step(worker) in --concurrency workers for --duration seconds;
+    # step returns whether the request succeeded, or None when the worker
+    # has nothing left to do.
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(i: int):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            ok = await step(i)
+            if ok is None:
+                return
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    result = summarize(latencies, errors, time.perf_counter() - start)
+    print(
+        f"{name:<10} {result['rps']:>8.1f} "
+        + " ".join(
+            f"{result[k]:>8.1f}" if result[k] is not None else f"{'-':>8}"
+            for k in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        + f" {result['errors']:>7}"
+    )
+    return result
+
+
+async def bench_http(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30)
+    async with client:
+        run = uuid.uuid4().hex[:8]
+        emails = [f"bench-{run}-{i}@example.com" for i in range(args.users)]
+        for email in emails:
+            response = await client.post(
+                "/register", json={"email": email, "password": PASSWORD}
+            )
+            response.raise_for_status()
+
+        async def login(email: str) -> dict | None:
+            response = await client.post(
+                "/login", json={"email": email, "password": PASSWORD}
+            )
+            return response.json()["data"] if response.status_code == 200 else None
+
+        print(
+            f"{'endpoint':<10} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'errors':>7}"
+        )
+        results = {}
+        sessions = []
+
+        async def login_step(i: int):
+            tokens = await login(emails[i % len(emails)])
+            if tokens is not None:
+                sessions.append(tokens)
+            return tokens is not None
+
+        results["login"] = await phase("login", args, login_step)
+
+        async def logout_step(i: int):
+            if not sessions:
+                return None
+            tokens = sessions.pop()
+            response = await client.post(
+                "/logout",
+                headers={"Authorization": f"Bearer {tokens['access_token']}"},
+            )
+            return response.status_code == 200
+
+        results["logout"] = await phase("logout", args, logout_step)
+
+        # One session per worker: refresh rotates it, /me reads with it.
+        owned = [
+            await login(emails[i % len(emails)]) for i in range(args.concurrency)
+        ]
+
+        async def refresh_step(i: int):
+            response = await client.post(
+                "/refresh",
+                headers={"Authorization": f"Bearer {owned[i]['refresh_token']}"},
+            )
+            if response.status_code != 200:
+                return False
+            owned[i] = response.json()["data"]
+            return True
+
+        results["refresh"] = await phase("refresh", args, refresh_step)
+
+        async def me_step(i: int):
+            response = await client.get(
+                "/me", headers={"Authorization": f"Bearer {owned[i]['access_token']}"}
+            )
+            return response.status_code == 200
+
+        results["me"] = await phase("me", args, me_step)
+        print()
+        return results
+
+
+def spawn(args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DB_SCHEMA": args.schema,
+        "BCRYPT_COST": str(args.bcrypt_cost),
+        "JWT_ACCESS_TOKEN_EXPIRE_SECONDS": str(args.access_ttl),
+        "JWT_REFRESH_TOKEN_EXPIRE_SECONDS": str(args.refresh_ttl),
+        "PYTHONPATH": os.pathsep.join([".", os.path.join("..", "..")]),
+    }
+    port = args.url.rsplit(":", 1)[-1].rstrip("/")
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", port]
+    process = subprocess.Popen(
+        [*command, "--log-level", "warning"], cwd=SERVICE, env=env
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"auth service exited with {process.returncode}")
+        try:
+            if httpx.get(f"{args.url}/healthz", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("auth service did not become healthy")
+
+
+def compare(report: dict, baseline: dict, args) -> list[str]:
+    if report["params"] != baseline["params"]:
+        return [f"parameters differ from the baseline: {baseline['params']}"]
+    tolerance = args.tolerance
+    regressions = []
+    for name, current in report["lib"].items():
+        before = baseline["lib"].get(name)
+        if not before:
+            continue
+        # Older baselines carry only the figure, without its runs.
+        runs = before.get("runs") or [before["us_per_op"]]
+        allowed = max(
+            before["us_per_op"] * tolerance, max(runs) - min(runs), args.floor_us
+        )
+        if current["us_per_op"] - before["us_per_op"] > allowed:
+            regressions.append(
+                f"{name}: {before['us_per_op']:.1f} -> "
+                f"{current['us_per_op']:.1f} us/op"
+            )
+    for name, current in report.get("http", {}).items():
+        before = baseline.get("http", {}).get(name)
+        if not before:
+            continue
+        if (
+            current["p95_ms"] is not None
+            and before["p95_ms"] is not None
+            and current["p95_ms"] - before["p95_ms"]
+            > max(before["p95_ms"] * tolerance, args.floor_ms)
+        ):
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms"
+            )
+        if current["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {before['rps']:.1f} -> {current['rps']:.1f} rps"
+            )
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--spawn", action="store_true")
+    parser.add_argument("--schema", default="auth_bench")
+    parser.add_argument("--lib-only", action="store_true")
+    parser.add_argument("--bcrypt-cost", type=int, default=12)
+    parser.add_argument("--access-ttl", type=int, default=60)
+    parser.add_argument("--refresh-ttl", type=int, default=180)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--out", help="write the report to this JSON file")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=7, help="runs per function")
+    parser.add_argument("--floor-us", type=float, default=1.0)
+    parser.add_argument("--floor-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    report = {
+        "params": {
+            "bcrypt_cost": args.bcrypt_cost,
+            "access_ttl": args.access_ttl,
+            "refresh_ttl": args.refresh_ttl,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "lib": bench_lib(args),
+    }
+
+    if not args.lib_only:
+        process = spawn(args) if args.spawn else None
+        try:
+            report["http"] = await bench_http(args)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""Fake OpenAI-compatible upstream for load tests: streams chat completions
+at a fixed token rate and answers the non-streaming title requests.
+
+    cd app && PYTHONPATH=. python bench/fake_llm.py --port 8090 \\
+        --tokens 200 --token-rate 50 --latency 0.3 --fail-rate 0.01
+
+Point the conversation service at it with
+OPENAI_BASE_URL=http://localhost:8090/v1 (any OPENAI_API_KEY is accepted).
+--fail-rate answers with a 500 before streaming; --drop-rate cuts the
+stream halfway without the [DONE] marker.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import orjson
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = "the service streams each token to the client as soon as it arrives".split()
+
+
+def chunk(id: str, created: int, delta: dict, finish_reason=None) -> bytes:
+    data = {
+        "id": id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": "fake",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+def prompt_tokens(messages: list) -> int:
+    # Roughly four characters per token, like the real tokenizer on English.
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI()
+    stats = {"requests": 0, "streams": 0, "open": 0, "failed": 0, "dropped": 0}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        await asyncio.sleep(args.latency)
+        if random.random() < args.fail_rate:
+            stats["failed"] += 1
+            return JSONResponse({"error": {"message": "injected failure"}}, 500)
+
+        if not body.get("stream"):
+            return {
+                "choices": [
+                    {"message": {"role": "assistant", "content": "Fake Title"}}
+                ]
+            }
+
+        id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        drop = random.random() < args.drop_rate
+        usage = (body.get("stream_options") or {}).get("include_usage")
+
+        async def stream():
+            stats["streams"] += 1
+            stats["open"] += 1
+            try:
+                yield chunk(id, created, {"role": "assistant", "content": ""})
+                for i in range(args.tokens):
+                    if drop and i == args.tokens // 2:
+                        stats["dropped"] += 1
+                        return
+                    await asyncio.sleep(1 / args.token_rate)
+                    yield chunk(id, created, {"content": WORDS[i % len(WORDS)] + " "})
+                yield chunk(id, created, {}, "stop")
+                if usage:
+                    prompt = prompt_tokens(body.get("messages", []))
+                    data = {
+                        "id": id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": "fake",
+                        "choices": [],
+                        "usage": {
+                            "prompt_tokens": prompt,
+                            "completion_tokens": args.tokens,
+                            "total_tokens": prompt + args.tokens,
+                            "prompt_tokens_details": {"cached_tokens": 0},
+                        },
+                    }
+                    yield b"data: " + orjson.dumps(data) + b"\n\n"
+                yield b"data: [DONE]\n\n"
+            finally:
+                stats["open"] -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--tokens", type=int, default=200, help="tokens per reply")
+    parser.add_argument("--token-rate", type=float, default=50, help="tokens/s")
+    parser.add_argument(
+        "--latency", type=float, default=0.3, help="seconds before the first byte"
+    )
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
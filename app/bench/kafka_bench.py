@@ -0,0 +1,142 @@
+"""Producer/consumer throughput per Kafka profile against a local broker,
+using payloads shaped like the auth.user.* and conversation.* events.
+
+    cd app && PYTHONPATH=. python bench/kafka_bench.py \\
+        --bootstrap localhost:29092 --messages 20000 --profiles latency throughput
+
+Events go to bench.<topic> so the real topics are left alone. The
+serializer comparison at the top needs no broker.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+from lib.infra import KAFKA_PROFILES, new_kafka_consumer, new_kafka_producer
+from lib.utils import create_event
+
+
+def user_event() -> dict:
+    now = datetime.now(timezone.utc)
+    return create_event(
+        {
+            "id": str(uuid.uuid4()),
+            "seq": 1,
+            "created_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+            "email": "someone@example.com",
+            "username": "admiring_turing_1234",
+            "hashed_password": "$2b$12$" + "x" * 53,
+            "name": "Some One",
+            "bio": "Developer. " * 5,
+            "profile_url": None,
+            "role": "user",
+            "sso_provider": None,
+            "sso_id": None,
+            "is_first_login": True,
+            "is_active": True,
+            "change_password_on_next_login": False,
+            "last_login_at": now,
+            "last_password_change_at": None,
+        }
+    )
+
+
+def message_event() -> dict:
+    now = datetime.now(timezone.utc)
+    return create_event(
+        {
+            "id": str(uuid.uuid4()),
+            "seq": 1,
+            "created_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+            "conversation_id": str(uuid.uuid4()),
+            "parent_id": str(uuid.uuid4()),
+            "role": "assistant",
+            "content": "Here is how to configure the service. " * 40,
+        }
+    )
+
+
+TOPICS = {
+    "auth.user.updated": user_event,
+    "conversation.assistant.message": message_event,
+}
+
+
+def bench_serializers():
+    print(f"{'payload':<32} {'json us':>9} {'orjson us':>10}")
+    for topic, make in TOPICS.items():
+        event = make()
+        number = 20000
+        stdlib = timeit.timeit(lambda: json.dumps(event).encode("utf-8"), number=number)
+        fast = timeit.timeit(lambda: orjson.dumps(event), number=number)
+        print(f"{topic:<32} {stdlib / number * 1e6:>9.2f} {fast / number * 1e6:>10.2f}")
+    print()
+
+
+async def produce(bootstrap: str, profile: str, topic: str, events: list) -> float:
+    producer = new_kafka_producer(bootstrap_servers=[bootstrap], profile=profile)
+    await producer.start()
+    try:
+        start = time.perf_counter()
+        # Same pattern as the outbox relay: enqueue everything, then await acks.
+        futures = [await producer.send(topic, value=event) for event in events]
+        await asyncio.gather(*futures)
+        return time.perf_counter() - start
+    finally:
+        await producer.stop()
+
+
+async def consume(bootstrap: str, profile: str, topic: str, count: int) -> float:
+    consumer = new_kafka_consumer(
+        topic,
+        group_id=f"bench-{uuid.uuid4()}",
+        bootstrap_servers=[bootstrap],
+        enable_auto_commit=False,
+        profile=profile,
+    )
+    await consumer.start()
+    try:
+        received, start = 0, None
+        while received < count:
+            batches = await consumer.getmany(timeout_ms=1000, max_records=500)
+            if start is None and batches:
+                start = time.perf_counter()
+            received += sum(len(records) for records in batches.values())
+        return time.perf_counter() - start
+    finally:
+        await consumer.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bootstrap", default="localhost:29092")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--profiles", nargs="+", default=list(KAFKA_PROFILES))
+    args = parser.parse_args()
+
+    bench_serializers()
+
+    print(f"{'topic':<32} {'profile':<11} {'produce/s':>10} {'consume/s':>10}")
+    for name, make in TOPICS.items():
+        events = [make() for _ in range(args.messages)]
+        for profile in args.profiles:
+            topic = f"bench.{name}.{profile}.{uuid.uuid4().hex[:8]}"
+            produced = await produce(args.bootstrap, profile, topic, events)
+            consumed = await consume(args.bootstrap, profile, topic, len(events))
+            print(
+                f"{name:<32} {profile:<11} "
+                f"{len(events) / produced:>10.0f} {len(events) / consumed:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Compare the orjson response path with the previous jsonable_encoder +
+stdlib json path on large message lists.
+
+    cd app && PYTHONPATH=. python bench/response_bench.py [--sizes 100 1000 10000]
+"""
+
+import argparse
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse as StdJSONResponse
+from lib.response import DataResponseModel, JSONResponse, create_response
+
+
+def messages(n: int) -> list[dict]:
+    # Same shape as Message.to_dict().
+    start = datetime.now(timezone.utc)
+    conversation_id = str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "seq": i,
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": start + timedelta(seconds=i),
+            "deleted_at": None,
+            "conversation_id": conversation_id,
+            "parent_id": None,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": "lorem ipsum dolor sit amet " * 20,
+        }
+        for i in range(n)
+    ]
+
+
+def before(data: dict) -> bytes:
+    content = jsonable_encoder(DataResponseModel(message="ok", data=data))
+    return StdJSONResponse(content).body
+
+
+def after(data: dict) -> bytes:
+    return JSONResponse(create_response("ok", data)).body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for n in args.sizes:
+        data = {"conversation": {"id": str(uuid.uuid4())}, "messages": messages(n)}
+        number = max(1, 10000 // n)
+        results = []
+        for fn in (before, after):
+            best = min(timeit.repeat(lambda: fn(data), number=number, repeat=args.repeat))
+            results.append(best / number * 1000)
+        print(
+            f"{n:>10} {results[0]:>10.3f} {results[1]:>10.3f} "
+            f"{results[0] / results[1]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Streaming load test for the conversation service: N concurrent chats,
+each sending --turns completions in a row.
+
+    cd app && PYTHONPATH=. python bench/fake_llm.py &
+    OPENAI_BASE_URL=http://localhost:8090/v1 RATE_LIMIT_BURST=100000 \\
+        uvicorn main:app ...   # the conversation service, from its directory
+    PYTHONPATH=. python bench/stream_bench.py --url http://localhost:8000 \\
+        --concurrency 100 --duration 60 --pid $(pgrep -nf "uvicorn main:app")
+
+Reports completed requests/s, status codes, time to first byte and the gap
+between chunks. With --pid (Linux) it also samples the service's RSS and
+reports the growth per open stream over the idle baseline. Anonymous chats
+share one rate-limit bucket, hence the raised RATE_LIMIT_BURST above.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+
+def percentiles(values: list[float]) -> str:
+    if not values:
+        return "-"
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p))]
+    return " ".join(
+        f"p{int(p * 100)}={pick(p) * 1000:.1f}ms" for p in (0.5, 0.95, 0.99)
+    )
+
+
+def rss(pid: int) -> int:
+    # Resident set size in bytes.
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class Results:
+    def __init__(self):
+        self.statuses = Counter()
+        self.ttfb: list[float] = []
+        self.gaps: list[float] = []
+        self.completed = 0
+        self.incomplete = 0
+        self.peak_rss = 0
+
+
+async def turn(client: httpx.AsyncClient, args, results: Results, body: dict):
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", args.path, json=body) as response:
+            results.statuses[response.status_code] += 1
+            last, tail = None, b""
+            async for data in response.aiter_raw():
+                now = time.perf_counter()
+                if last is None:
+                    results.ttfb.append(now - start)
+                else:
+                    results.gaps.append(now - last)
+                last, tail = now, (tail + data)[-32:]
+            # Upstream failures are relayed inside a 200 stream, so only a
+            # stream that ends in [DONE] counts as completed.
+            if response.status_code == 200 and b"[DONE]" in tail:
+                results.completed += 1
+            else:
+                results.incomplete += 1
+    except httpx.HTTPError as e:
+        results.statuses[type(e).__name__] += 1
+
+
+async def chat(client: httpx.AsyncClient, args, results: Results, deadline: float):
+    while time.perf_counter() < deadline:
+        conversation_id = str(uuid.uuid4())
+        messages = []
+        for i in range(args.turns):
+            if time.perf_counter() >= deadline:
+                return
+            content = f"Question {i}: {args.prompt}"
+            messages.append({"role": "user", "content": content})
+            body = {"conversation_id": conversation_id, "messages": messages}
+            await turn(client, args, results, body)
+
+
+async def sample(args, results: Results):
+    while True:
+        results.peak_rss = max(results.peak_rss, rss(args.pid))
+        await asyncio.sleep(0.2)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/v1/conversation")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--prompt", default="How do I configure the service?")
+    parser.add_argument("--token", help="access token; anonymous when omitted")
+    parser.add_argument("--pid", type=int, help="service process to sample RSS of")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    results = Results()
+    idle_rss = rss(args.pid) if args.pid else 0
+    sampler = asyncio.create_task(sample(args, results)) if args.pid else None
+
+    async with httpx.AsyncClient(
+        base_url=args.url, headers=headers, limits=limits, timeout=None
+    ) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *(chat(client, args, results, deadline) for _ in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - start
+
+    if sampler is not None:
+        sampler.cancel()
+
+    print(f"concurrency   {args.concurrency}")
+    print(
+        f"completed     {results.completed} in {elapsed:.1f}s "
+        f"= {results.completed / elapsed:.1f} req/s"
+    )
+    print(f"incomplete    {results.incomplete}")
+    print(f"statuses      {dict(results.statuses)}")
+    print(f"ttfb          {percentiles(results.ttfb)}")
+    print(f"chunk gap     {percentiles(results.gaps)}")
+    if args.pid:
+        growth = results.peak_rss - idle_rss
+        print(
+            f"rss           idle={idle_rss / 2**20:.1f}MiB "
+            f"peak={results.peak_rss / 2**20:.1f}MiB "
+            f"per stream={growth / args.concurrency / 1024:.1f}KiB"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
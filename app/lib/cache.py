@@ -0,0 +1,311 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from logging import getLogger
+
+import orjson
+
+logger = getLogger(__name__)
+
+
+class ProfileCache:
+    # Two-tier read-through cache of user profiles keyed by user id: an
+    # in-process LRU in front of Redis, in front of the loader (Postgres).
+    # Writers call invalidate(), which drops the Redis entry and tells every
+    # replica over pub/sub to drop its local copy. It also bumps a per-user
+    # generation, so a reader that loaded the profile before the write cannot
+    # put the old copy back afterwards.
+
+    # KEYS: entry, generation. ARGV: generation read before loading, data,
+    # ttl. Returns 1 if stored, 0 if an invalidation happened meanwhile.
+    STORE = """
+    if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+        return 0
+    end
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+    """
+
+    def __init__(
+        self,
+        redis,
+        namespace: str,
+        maxsize: int = int(os.getenv("PROFILE_CACHE_SIZE", 10000)),
+        ttl: int = int(os.getenv("PROFILE_CACHE_TTL", 300)),
+        local_ttl: int = int(os.getenv("PROFILE_CACHE_LOCAL_TTL", 60)),
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        self.channel = f"{namespace}:invalidate"
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Bounds staleness if an invalidation message is lost.
+        self.local_ttl = local_ttl
+        self.store_script = redis.register_script(self.STORE)
+        self.entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.listener: asyncio.Task | None = None
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def key(self, id: str) -> str:
+        return f"{self.namespace}:{id}"
+
+    def generation(self, id: str) -> str:
+        return f"{self.namespace}:{id}:gen"
+
+    def evict(self, id: str) -> None:
+        self.entries.pop(id, None)
+
+    def remember(self, id: str, profile: dict) -> None:
+        self.entries[id] = (time.monotonic() + self.local_ttl, profile)
+        self.entries.move_to_end(id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def get(self, id: str, loader) -> dict | None:
+        # loader(id) returns a JSON-serializable dict, or None if the user
+        # does not exist; misses are not cached.
+        entry = self.entries.get(id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.entries.move_to_end(id)
+                self.local_hits += 1
+                return entry[1]
+            del self.entries[id]
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(self.key(id))
+                pipe.get(self.generation(id))
+                cached, generation = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"cache:{self.namespace}:get|{e}")
+            cached, generation = None, None
+        if cached is not None:
+            profile = orjson.loads(cached)
+            self.remember(id, profile)
+            self.redis_hits += 1
+            return profile
+
+        self.misses += 1
+        profile = await loader(id)
+        if profile is None:
+            return None
+        # Round-trip through JSON so every tier hands out the same shape.
+        data = orjson.dumps(profile)
+        profile = orjson.loads(data)
+        try:
+            stored = await self.store_script(
+                keys=[self.key(id), self.generation(id)],
+                args=[generation or b"", data, self.ttl],
+            )
+        except Exception as e:
+            logger.warning(f"cache:{self.namespace}:set|{e}")
+            stored = True
+        # Not stored: the profile changed while it was loading, so this copy
+        # may predate the change. It is still this request's answer.
+        if stored:
+            self.remember(id, profile)
+        return profile
+
+    async def invalidate(self, *ids: str) -> None:
+        if not ids:
+            return
+        for id in ids:
+            self.evict(id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*[self.key(id) for id in ids])
+            for id in ids:
+                pipe.incr(self.generation(id))
+                pipe.expire(self.generation(id), self.ttl)
+                pipe.publish(self.channel, id)
+            await pipe.execute()
+
+    async def listen(self, pubsub) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                id = message["data"]
+                self.evict(id.decode() if isinstance(id, bytes) else id)
+        finally:
+            # Without invalidations the local tier could serve stale data.
+            self.entries.clear()
+            self.local_ttl = 0
+            await pubsub.aclose()
+
+    async def start_listener(self) -> None:
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self.listener = asyncio.create_task(self.listen(pubsub))
+
+    async def stop_listener(self) -> None:
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.listener = None
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": (
+                (self.local_hits + self.redis_hits) / lookups if lookups else 0.0
+            ),
+        }
+
+
+class MessageLog:
+    # Write-through, per-conversation message log in Redis. A Redis list
+    # holds the newest `maxlen` messages; a companion flag marks logs that
+    # still start at the conversation's first message, which is what thread
+    # loads need. Both keys expire after `ttl` idle seconds.
+
+    # KEYS: log, complete flag, seed guard. ARGV: mode, maxlen, ttl,
+    # messages... Mode "append" extends an existing log (a missing one is
+    # never started mid-conversation, but blocks seeding for a while, since
+    # a concurrent seed may have read Postgres before this message);
+    # "create" starts the log of a new conversation; "seed" fills it from a
+    # full history read unless anything was appended meanwhile.
+    APPEND = """
+    local mode = ARGV[1]
+    if mode == 'append' and redis.call('EXISTS', KEYS[1], KEYS[2]) == 0 then
+        redis.call('SET', KEYS[3], '1', 'EX', 30)
+        return 0
+    end
+    if mode == 'seed' and redis.call('EXISTS', KEYS[1], KEYS[2], KEYS[3]) > 0 then
+        return 0
+    end
+    if mode ~= 'append' then
+        redis.call('DEL', KEYS[1])
+        redis.call('SET', KEYS[2], '1')
+    end
+    for i = 4, #ARGV do
+        redis.call('RPUSH', KEYS[1], ARGV[i])
+    end
+    if redis.call('LLEN', KEYS[1]) > tonumber(ARGV[2]) then
+        redis.call('LTRIM', KEYS[1], -tonumber(ARGV[2]), -1)
+        redis.call('DEL', KEYS[2])
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        redis.call('EXPIRE', KEYS[2], ARGV[3])
+    end
+    return 1
+    """
+
+    def __init__(
+        self,
+        redis,
+        namespace: str,
+        maxlen: int = int(os.getenv("MESSAGE_LOG_SIZE", 500)),
+        ttl: int = int(os.getenv("MESSAGE_LOG_TTL", 3600)),
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self.append_script = redis.register_script(self.APPEND)
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, id: str) -> list[str]:
+        key = f"{self.namespace}:{id}"
+        return [key, f"{key}:complete", f"{key}:seeding"]
+
+    @staticmethod
+    def decode(data: bytes) -> dict:
+        message = orjson.loads(data)
+        message["created_at"] = datetime.fromisoformat(message["created_at"])
+        return message
+
+    async def write(self, mode: str, id: str, messages: list[dict]) -> None:
+        try:
+            await self.append_script(
+                keys=self.keys(id),
+                args=[
+                    mode,
+                    self.maxlen,
+                    self.ttl,
+                    *(orjson.dumps(m) for m in messages),
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"cache:{self.namespace}:{mode}|{e}")
+            await self.discard(id)
+
+    async def append(self, id: str, *messages: dict, create: bool = False) -> None:
+        # Called once the messages are committed; `create` when they open
+        # a new conversation, so the log is complete from the start.
+        await self.write("create" if create else "append", id, list(messages))
+
+    async def seed(self, id: str, messages: list[dict]) -> None:
+        # Seeds the log from a full history read from Postgres.
+        if len(messages) <= self.maxlen:
+            await self.write("seed", id, messages)
+
+    async def discard(self, id: str) -> None:
+        try:
+            await self.redis.delete(*self.keys(id))
+        except Exception as e:
+            logger.warning(f"cache:{self.namespace}:discard|{e}")
+
+    async def history(self, id: str) -> list[dict] | None:
+        # The whole conversation in (created_at, seq) order, or None when
+        # the log is missing or no longer reaches back to the start.
+        log, complete, _ = self.keys(id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(complete)
+                pipe.lrange(log, 0, -1)
+                pipe.expire(log, self.ttl)
+                pipe.expire(complete, self.ttl)
+                found, data, *_ = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"cache:{self.namespace}:history|{e}")
+            found = False
+        if not found:
+            self.misses += 1
+            return None
+        self.hits += 1
+        messages = [self.decode(m) for m in data]
+        # Concurrent turns may append slightly out of commit order.
+        messages.sort(key=lambda m: (m["created_at"], m["seq"]))
+        return messages
+
+    async def last(self, id: str) -> dict | None:
+        # The newest message, or None when the log has nothing to say (the
+        # caller then asks Postgres).
+        try:
+            messages = await self.redis.lrange(self.keys(id)[0], -8, -1)
+        except Exception as e:
+            logger.warning(f"cache:{self.namespace}:last|{e}")
+            messages = []
+        if not messages:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return max(
+            (self.decode(m) for m in messages),
+            key=lambda m: (m["created_at"], m["seq"]),
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "maxlen": self.maxlen,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,63 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+
+class BoundedExecutor:
+    # Runs blocking, GIL-releasing work (e.g. bcrypt) off the event loop.
+    # At most `max_workers` calls run at once and at most `max_queue` wait;
+    # anything beyond that is rejected immediately with a 503.
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        retry_after: int = 1,
+        name: str = "executor",
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _release(self, _) -> None:
+        self.pending -= 1
+        self.completed += 1
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = self.executor.submit(fn, *args)
+        # Released when the work actually finishes, even if the caller is
+        # cancelled while waiting, so the cap reflects busy threads.
+        future.add_done_callback(
+            lambda f: loop.call_soon_threadsafe(self._release, f)
+        )
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": min(self.pending, self.max_workers),
+            "queued": max(self.pending - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,66 @@
+import json
+import re
+
+from sqlalchemy import text
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+async def explain(conn, stmt) -> dict:
+    sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def leading_column(conn, index: str) -> str:
+    result = await conn.execute(
+        text(
+            "SELECT a.attname FROM pg_class i "
+            "JOIN pg_index x ON x.indexrelid = i.oid "
+            "JOIN pg_attribute a "
+            "ON a.attrelid = x.indrelid AND a.attnum = x.indkey[0] "
+            "WHERE i.relname = :index"
+        ),
+        {"index": index},
+    )
+    return result.scalar()
+
+
+async def unindexed_scans(conn, stmt) -> list[str]:
+    # With seq scans priced out the planner only keeps one when no index
+    # applies. An index scan whose condition skips the leading column
+    # (e.g. the (seq, id) primary key probed by id) walks the whole index
+    # and is just as bad.
+    await conn.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = await explain(conn, stmt)
+    scans = []
+    for node in _walk(plan):
+        if node["Node Type"] == "Seq Scan":
+            scans.append(f"seq scan on {node['Relation Name']}")
+        elif node["Node Type"] in (
+            "Index Scan",
+            "Index Only Scan",
+            "Bitmap Index Scan",
+        ):
+            column = await leading_column(conn, node["Index Name"])
+            if not re.search(rf"\b{column}\b", node.get("Index Cond", "")):
+                scans.append(f"full scan of {node['Index Name']}")
+    return scans
+
+
+async def check_index_scans(engine, queries: dict) -> bool:
+    ok = True
+    async with engine.connect() as conn:
+        for name, stmt in queries.items():
+            async with conn.begin():
+                scans = await unindexed_scans(conn, stmt)
+            print(f"{name}: {', '.join(scans) or 'ok'}")
+            ok = ok and not scans
+    return ok
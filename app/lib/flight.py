@@ -0,0 +1,223 @@
+import asyncio
+import os
+import uuid
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+FLIGHT_TTL = int(os.getenv("FLIGHT_TTL", 300))
+FLIGHT_BLOCK_MS = int(os.getenv("FLIGHT_BLOCK_MS", 1000))
+FLIGHT_BATCH = int(os.getenv("FLIGHT_BATCH", 100))
+
+
+class Flight:
+    # One in-flight byte stream. Chunks are kept until it finishes so a
+    # subscriber that attaches late still gets the whole response.
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: list[bytes] = []
+        self.done = False
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        # Token of the leader holding the Redis lock, if any.
+        self.token: str | None = None
+
+    def publish(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+        self.wakeup.set()
+        self.wakeup = asyncio.Event()
+
+    def finish(self) -> None:
+        self.done = True
+        self.wakeup.set()
+
+    async def subscribe(self):
+        i = 0
+        while True:
+            wakeup = self.wakeup
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                return
+            await wakeup.wait()
+
+
+class SingleFlight:
+    # Coalesces identical streaming requests by key. The first caller leads:
+    # it runs the generator in a task owned by the flight, so the work
+    # outlives the request that started it, and every caller (the leader
+    # included) streams from the flight. Across replicas a Redis lock picks
+    # the leader, which mirrors its chunks into a Redis stream that the
+    # other replicas relay from. Without Redis each replica leads its own.
+
+    # Deletes the lock only if this leader still holds it.
+    RELEASE = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(
+        self,
+        redis,
+        namespace: str,
+        ttl: int = FLIGHT_TTL,
+        block_ms: int = FLIGHT_BLOCK_MS,
+        batch: int = FLIGHT_BATCH,
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        # Upper bound on a generation; the lock and stream expire after it.
+        self.ttl = ttl
+        self.block_ms = block_ms
+        self.batch = batch
+        self.release_script = redis.register_script(self.RELEASE)
+        self.flights: dict[str, Flight] = {}
+        self.led = 0
+        self.joined = 0
+        self.relayed = 0
+
+    def lock(self, key: str) -> str:
+        return f"{self.namespace}:{key}:lock"
+
+    def stream(self, key: str, token: str) -> str:
+        # Per leader, so a follower never reads a previous flight's stream.
+        return f"{self.namespace}:{key}:{token}"
+
+    async def acquire(self, key: str) -> tuple[Flight, bool]:
+        # Returns the flight for `key` and whether the caller leads it. A
+        # leader must either start() or abandon() the flight.
+        flight = self.flights.get(key)
+        if flight is not None:
+            self.joined += 1
+            return flight, False
+        # Registered before the first await so concurrent local callers
+        # attach to it.
+        flight = self.flights[key] = Flight(key)
+        lock, token = self.lock(key), uuid.uuid4().hex
+        try:
+            for _ in range(3):
+                if await self.redis.set(lock, token, nx=True, ex=self.ttl):
+                    flight.token = token
+                    break
+                leader = await self.redis.get(lock)
+                if leader is not None:
+                    self.relayed += 1
+                    flight.token = leader.decode()
+                    flight.task = asyncio.create_task(self.relay(flight))
+                    return flight, False
+        except Exception as e:
+            logger.warning(f"flight:{self.namespace}:lock|{e}")
+        # Leads through Redis, or locally only when the lock is unavailable.
+        self.led += 1
+        return flight, True
+
+    def start(self, flight: Flight, generator) -> None:
+        flight.task = asyncio.create_task(self.run(flight, generator))
+
+    async def abandon(self, flight: Flight) -> None:
+        # The leader failed before starting; followers see an empty stream.
+        await self.close(flight)
+
+    def forget(self, flight: Flight) -> None:
+        flight.finish()
+        if self.flights.get(flight.key) is flight:
+            del self.flights[flight.key]
+
+    async def close(self, flight: Flight, mirror: asyncio.Task | None = None) -> None:
+        self.forget(flight)
+        if flight.token is None:
+            return
+        if mirror is not None:
+            # Lets it flush what is left, so the end marker comes last.
+            await mirror
+        stream = self.stream(flight.key, flight.token)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.xadd(stream, {"end": 1})
+                pipe.expire(stream, 60)
+                await pipe.execute()
+            await self.release_script(
+                keys=[self.lock(flight.key)], args=[flight.token]
+            )
+        except Exception as e:
+            logger.warning(f"flight:{self.namespace}:release|{e}")
+
+    async def run(self, flight: Flight, generator) -> None:
+        mirror = None
+        if flight.token is not None:
+            mirror = asyncio.create_task(self.mirror(flight))
+        try:
+            async for chunk in generator:
+                flight.publish(chunk)
+        except Exception as e:
+            logger.exception(f"flight:{self.namespace}:error|{flight.key}|{e}")
+        finally:
+            await self.close(flight, mirror)
+
+    async def mirror(self, flight: Flight) -> None:
+        # Copies the leader's chunks into its Redis stream off the streaming
+        # path. Whatever piled up during a round trip goes out in the next
+        # pipeline (up to `batch` chunks), so a slow Redis delays remote
+        # followers, not the local stream.
+        stream = self.stream(flight.key, flight.token)
+        i = 0
+        try:
+            while True:
+                wakeup = flight.wakeup
+                if i < len(flight.chunks):
+                    chunks = flight.chunks[i : i + self.batch]
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        for chunk in chunks:
+                            pipe.xadd(stream, {"data": chunk})
+                        pipe.expire(stream, self.ttl)
+                        await pipe.execute()
+                    i += len(chunks)
+                elif flight.done:
+                    return
+                else:
+                    await wakeup.wait()
+        except Exception as e:
+            # Remote followers stop once the lock is released.
+            logger.warning(f"flight:{self.namespace}:mirror|{e}")
+
+    async def relay(self, flight: Flight) -> None:
+        # Follows another replica's flight until its end marker, or until
+        # its lock is gone (or taken over) and nothing new arrives.
+        stream = self.stream(flight.key, flight.token)
+        last = "0-0"
+        try:
+            while True:
+                result = await self.redis.xread(
+                    {stream: last}, block=self.block_ms, count=100
+                )
+                if not result:
+                    leader = await self.redis.get(self.lock(flight.key))
+                    if leader is None or leader.decode() != flight.token:
+                        return
+                    continue
+                for last, fields in result[0][1]:
+                    if b"end" in fields:
+                        return
+                    flight.publish(fields[b"data"])
+        except Exception as e:
+            logger.warning(f"flight:{self.namespace}:relay|{e}")
+        finally:
+            self.forget(flight)
+
+    async def stop(self) -> None:
+        tasks = [f.task for f in self.flights.values() if f.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.flights),
+            "led": self.led,
+            "joined": self.joined,
+            "relayed": self.relayed,
+        }
@@ -1,34 +1,233 @@
-def new_db_session(url):
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
+import os
+import time
+from contextvars import ContextVar
 
-    engine = create_engine(url)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+_engines: dict = {}
+_engine_names: dict = {}
+_sessionmakers: dict = {}
+_http_stats: dict = {}
+# Seconds the current checkout spent opening new connections.
+_connecting: ContextVar[list | None] = ContextVar("connecting", default=None)
 
-def new_db(url):
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
 
-    engine = create_engine(url)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _new_metered_pool_class():
+    from sqlalchemy.exc import TimeoutError
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-    def get_db():
-        db = SessionLocal()
-        try:
+    class MeteredPool(AsyncAdaptedQueuePool):
+        def __init__(self, *args, max_overflow: int = 10, **kwargs):
+            super().__init__(*args, max_overflow=max_overflow, **kwargs)
+            # Kept for the stats; QueuePool only has it privately.
+            self.max_overflow = max_overflow
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.connect_seconds_total = 0.0
+
+        def _do_get(self):
+            # QueuePool._do_get retries by calling itself; only the outer
+            # call measures.
+            if _connecting.get() is not None:
+                return super()._do_get()
+            connecting = [0.0]
+            token = _connecting.set(connecting)
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                _connecting.reset(token)
+                # Waiting for a slot only; opening a connection is not a wait.
+                elapsed = time.perf_counter() - start - connecting[0]
+                self.checkouts += 1
+                self.wait_seconds_total += elapsed
+                self.wait_seconds_max = max(self.wait_seconds_max, elapsed)
+                self.connect_seconds_total += connecting[0]
+
+        def _create_connection(self):
+            start = time.perf_counter()
+            try:
+                return super()._create_connection()
+            finally:
+                connecting = _connecting.get()
+                if connecting is not None:
+                    connecting[0] += time.perf_counter() - start
+
+    return MeteredPool
+
+
+def new_async_engine(
+    url: str,
+    pool_size: int = int(os.getenv("DB_POOL_SIZE", 5)),
+    max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", 30)),
+    pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(
+        url,
+        poolclass=_new_metered_pool_class(),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+    )
+
+
+def get_async_engine(url: str, name: str = "default", **kwargs):
+    # One engine (and therefore one pool) per database per process. `name`
+    # labels its pool stats, which must not carry the URL.
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines[url] = new_async_engine(url, **kwargs)
+        _engine_names[url] = name
+    return engine
+
+
+def get_async_sessionmaker(url: str):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    SessionLocal = _sessionmakers.get(url)
+    if SessionLocal is None:
+        SessionLocal = _sessionmakers[url] = async_sessionmaker(
+            bind=get_async_engine(url), autoflush=False, expire_on_commit=False
+        )
+    return SessionLocal
+
+
+def new_async_db(url: str):
+    SessionLocal = get_async_sessionmaker(url)
+
+    async def get_db():
+        async with SessionLocal() as db:
             yield db
-        finally:
-            db.close()
 
     return get_db
 
 
+async def dispose_async_engines() -> None:
+    for engine in _engines.values():
+        await engine.dispose()
+
+
+def get_pool_stats() -> dict:
+    stats = {}
+    for url, engine in _engines.items():
+        pool = engine.pool
+        checkouts = getattr(pool, "checkouts", 0)
+        wait_seconds_total = getattr(pool, "wait_seconds_total", 0.0)
+        stats[_engine_names[url]] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": getattr(pool, "max_overflow", None),
+            "checkouts": checkouts,
+            "timeouts": getattr(pool, "timeouts", 0),
+            "wait_seconds_total": wait_seconds_total,
+            "wait_seconds_avg": wait_seconds_total / checkouts if checkouts else 0.0,
+            "wait_seconds_max": getattr(pool, "wait_seconds_max", 0.0),
+            "connect_seconds_total": getattr(pool, "connect_seconds_total", 0.0),
+        }
+    return stats
+
+
 def new_redis(host, port):
     import redis
 
     return redis.Redis(host=host, port=port)
 
 
+def new_async_redis(
+    host,
+    port,
+    max_connections: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 100)),
+    pool_timeout: float = float(os.getenv("REDIS_POOL_TIMEOUT", 5)),
+    socket_timeout: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5)),
+    socket_connect_timeout: float = float(
+        os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 2)
+    ),
+):
+    import redis.asyncio as redis
+
+    # Callers wait up to pool_timeout for a free connection instead of
+    # failing outright when all max_connections are in use.
+    pool = redis.BlockingConnectionPool(
+        host=host,
+        port=port,
+        max_connections=max_connections,
+        timeout=pool_timeout,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=socket_connect_timeout,
+        health_check_interval=30,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def new_http_client(
+    name: str,
+    max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100)),
+    max_keepalive_connections: int = int(
+        os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+    ),
+    keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60)),
+    http2: bool = os.getenv("HTTP_HTTP2", "true").lower() == "true",
+    timeout: float = float(os.getenv("HTTP_TIMEOUT", 60)),
+    connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5)),
+):
+    import httpx
+
+    stats = _http_stats[name] = {
+        "requests": 0,
+        "connections_opened": 0,
+        "http2_responses": 0,
+    }
+
+    # httpcore reports each new TCP connection through the trace extension;
+    # every other request was served from a pooled connection.
+    async def trace(event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            stats["connections_opened"] += 1
+
+    async def on_request(request) -> None:
+        stats["requests"] += 1
+        request.extensions["trace"] = trace
+
+    async def on_response(response) -> None:
+        if response.http_version == "HTTP/2":
+            stats["http2_responses"] += 1
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        event_hooks={"request": [on_request], "response": [on_response]},
+    )
+
+
+def get_http_stats() -> dict:
+    stats = {}
+    for name, counters in _http_stats.items():
+        requests = counters["requests"]
+        reused = max(requests - counters["connections_opened"], 0)
+        stats[name] = {
+            **counters,
+            "connections_reused": reused,
+            "reuse_ratio": reused / requests if requests else 0.0,
+        }
+    return stats
+
+
 def new_s3(s3_region, s3_endpoint, s3_access_key, s3_secret_key):
     import boto3
 
@@ -53,28 +252,100 @@ def new_chromadb(host, port):
     )
 
 
-def new_kafka_producer(bootstrap_servers: list[str]):
+# Kafka tuning presets, selected with KAFKA_PROFILE. Individual KAFKA_* env
+# vars override a profile, and explicit arguments override both.
+KAFKA_PROFILES = {
+    # aiokafka defaults: every send goes out on its own, uncompressed.
+    "latency": {
+        "producer": {
+            "acks": 1,
+            "linger_ms": 0,
+            "max_batch_size": 16384,
+            "compression_type": None,
+        },
+        "consumer": {
+            "fetch_min_bytes": 1,
+            "fetch_max_wait_ms": 100,
+            "max_partition_fetch_bytes": 1048576,
+            "enable_auto_commit": True,
+        },
+    },
+    # A few ms of linger buys large compressed batches and far fewer
+    # requests per event; the outbox relay and worker are off the request
+    # path, so that latency is not user-visible.
+    "throughput": {
+        "producer": {
+            "acks": "all",
+            "linger_ms": 10,
+            "max_batch_size": 262144,
+            "compression_type": "lz4",
+        },
+        "consumer": {
+            "fetch_min_bytes": 65536,
+            "fetch_max_wait_ms": 200,
+            "max_partition_fetch_bytes": 4194304,
+            "enable_auto_commit": True,
+        },
+    },
+}
 
-    import json
+KAFKA_ENV = {
+    "acks": ("KAFKA_ACKS", lambda v: v if v == "all" else int(v)),
+    "linger_ms": ("KAFKA_LINGER_MS", int),
+    "max_batch_size": ("KAFKA_MAX_BATCH_SIZE", int),
+    "compression_type": ("KAFKA_COMPRESSION_TYPE", lambda v: None if v == "none" else v),
+    "fetch_min_bytes": ("KAFKA_FETCH_MIN_BYTES", int),
+    "fetch_max_wait_ms": ("KAFKA_FETCH_MAX_WAIT_MS", int),
+    "max_partition_fetch_bytes": ("KAFKA_MAX_PARTITION_FETCH_BYTES", int),
+    "enable_auto_commit": ("KAFKA_ENABLE_AUTO_COMMIT", lambda v: v == "true"),
+}
 
+
+def kafka_config(kind: str, profile: str | None = None, **overrides) -> dict:
+    # kind is "producer" or "consumer"; None overrides are ignored.
+    profile = profile or os.getenv("KAFKA_PROFILE", "throughput")
+    config = dict(KAFKA_PROFILES[profile][kind])
+    for name in config:
+        env, parse = KAFKA_ENV[name]
+        if os.getenv(env):
+            config[name] = parse(os.getenv(env))
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    return config
+
+
+def new_kafka_producer(
+    bootstrap_servers: list[str], profile: str | None = None, **overrides
+):
+    import orjson
     from aiokafka import AIOKafkaProducer
 
     return AIOKafkaProducer(
         bootstrap_servers=bootstrap_servers,
-        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+        key_serializer=lambda k: k.encode("utf-8") if k is not None else None,
+        value_serializer=orjson.dumps,
+        **kafka_config("producer", profile, **overrides),
     )
 
 
-def new_kafka_consumer(*topics, group_id: str, bootstrap_servers: list[str]):
-    import json
-
+def new_kafka_consumer(
+    *topics,
+    group_id: str,
+    bootstrap_servers: list[str],
+    enable_auto_commit: bool | None = None,
+    profile: str | None = None,
+    **overrides,
+):
+    import orjson
     from aiokafka import AIOKafkaConsumer
 
     return AIOKafkaConsumer(
         *topics,
         bootstrap_servers=bootstrap_servers,
         group_id=group_id,
-        value_deserializer=lambda v: json.loads(v.decode("utf-8")),
+        key_deserializer=lambda k: k.decode("utf-8") if k is not None else None,
+        value_deserializer=orjson.loads,
         auto_offset_reset="earliest",
-        enable_auto_commit=True,
+        **kafka_config(
+            "consumer", profile, enable_auto_commit=enable_auto_commit, **overrides
+        ),
     )
\ No newline at end of file
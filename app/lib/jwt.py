@@ -1,5 +1,9 @@
+import asyncio
+import hashlib
+import math
 import os
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 
 import redis
@@ -30,14 +34,122 @@ class RefreshTokenPayload(TokenPayload):
     pass
 
 
+class TokenCache:
+    # LRU of verified payloads keyed by a digest of the token and the
+    # issuer/audience it was verified against. Entries die at the token's exp.
+
+    def __init__(self, maxsize: int = int(os.getenv("JWT_CACHE_SIZE", 10000))):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, TokenPayload] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str, issuer: str | None, audience: str | None) -> str:
+        return hashlib.sha256(f"{issuer}|{audience}|{token}".encode()).hexdigest()
+
+    def get(self, key: str) -> TokenPayload | None:
+        payload = self.entries.get(key)
+        if payload is not None and payload.exp < int(
+            datetime.now(timezone.utc).timestamp()
+        ):
+            del self.entries[key]
+            payload = None
+
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def set(self, key: str, payload: TokenPayload) -> None:
+        self.entries[key] = payload
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RevocationFilter:
+    # Bloom filter of blacklisted sid/jti values. A miss means the id is
+    # definitely not revoked; a hit still has to be confirmed in Redis.
+
+    def __init__(
+        self,
+        capacity: int = int(os.getenv("JWT_REVOCATION_FILTER_CAPACITY", 100000)),
+        error_rate: float = float(
+            os.getenv("JWT_REVOCATION_FILTER_ERROR_RATE", 0.001)
+        ),
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        # Only trusted while the pub/sub listener is known to be up.
+        self.ready = False
+
+    def _positions(self, id: str):
+        digest = hashlib.blake2b(id.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, id: str) -> None:
+        # Counts only ids that set a new bit, so this node's own pub/sub echo
+        # of a revocation does not count twice towards a rebuild.
+        added = False
+        for position in self._positions(id):
+            bit = 1 << (position & 7)
+            if not self.bits[position >> 3] & bit:
+                self.bits[position >> 3] |= bit
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, id: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(id)
+        )
+
+    def empty(self) -> "RevocationFilter":
+        # A new, empty filter of the same shape, for rebuilding off to the side.
+        return RevocationFilter(self.capacity, self.error_rate)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "count": self.count,
+            "capacity": self.capacity,
+            "bits": self.size,
+            "hashes": self.hashes,
+        }
+
+
 class JWTService:
     def __init__(
         self,
         secret: str = os.getenv("JWT_SECRET", "supersecret!"),
         algorithm: str = os.getenv("JWT_ALGORITHM", "HS256"),
+        cache: TokenCache | None = None,
     ):
         self.secret = secret
         self.algorithm = algorithm
+        self.cache = cache
 
     def decode(
         self, token: str, issuer: str | None = None, audience: str | None = None
@@ -53,6 +165,13 @@ class JWTService:
     def verify_token(
         self, token: str, issuer: str | None = None, audience: str | None = None
     ) -> TokenPayload:
+        key = None
+        if self.cache is not None and token:
+            key = self.cache.key(token, issuer, audience)
+            payload = self.cache.get(key)
+            if payload is not None:
+                return payload
+
         try:
             payload = TokenPayload(
                 **self.decode(token, issuer=issuer, audience=audience)
@@ -63,6 +182,9 @@ class JWTService:
         if payload.exp < int(datetime.now(timezone.utc).timestamp()):
             raise HTTPException(status_code=401, detail="Token has expired.")
 
+        if key is not None:
+            self.cache.set(key, payload)
+
         return payload
 
 
@@ -77,9 +199,18 @@ class JWTManager(JWTService):
         refresh_token_ttl: int = int(
             os.getenv("JWT_REFRESH_TOKEN_EXPIRE_SECONDS", 180)
         ),
+        cache: TokenCache | None = None,
+        revocations: RevocationFilter | None = None,
+        channel: str = "bl",
     ):
-        super().__init__(secret, algorithm)
+        super().__init__(secret, algorithm, cache)
         self.redis = redis
+        self.revocations = revocations
+        self.channel = channel
+        self.listener = None
+        self.rebuild_at = revocations.capacity if revocations else 0
+        # Ids revoked while a rebuild is scanning, replayed into the new filter.
+        self.pending: list[str] | None = None
         self.access_token_ttl = access_token_ttl
         self.refresh_token_ttl = refresh_token_ttl
 
@@ -133,16 +264,95 @@ class JWTManager(JWTService):
         except Exception as e:
             raise e
 
-        if self.redis.exists(f"bl:{payload.sid}"):
-            raise HTTPException(status_code=401, detail="Token is blacklisted.")
-
-        if self.redis.exists(f"bl:{payload.jti}"):
+        # Revocation is checked on every call, cached payload or not.
+        if self.is_revoked(payload):
             raise HTTPException(status_code=401, detail="Token is blacklisted.")
 
         return payload
 
+    def may_be_revoked(self, payload: TokenPayload) -> bool:
+        if self.revocations is None or not self.revocations.ready:
+            return True
+        return payload.sid in self.revocations or payload.jti in self.revocations
+
+    def is_revoked(self, payload: TokenPayload) -> bool:
+        if not self.may_be_revoked(payload):
+            return False
+        return self.redis.exists(f"bl:{payload.sid}", f"bl:{payload.jti}") > 0
+
     def blacklist(self, id: str) -> None:
-        self.redis.setex(f"bl:{id}", self.refresh_token_ttl, "blacklisted")
+        pipe = self.redis.pipeline()
+        pipe.setex(f"bl:{id}", self.refresh_token_ttl, "blacklisted")
+        pipe.publish(self.channel, id)
+        pipe.execute()
+        if self.revocations is not None:
+            self.revoke(id)
+
+    def revoke(self, id: str) -> None:
+        pending = self.pending
+        self.revocations.add(id)
+        if pending is not None:
+            pending.append(id)
+
+    def swap_revocations(self, fresh: RevocationFilter, pending: list[str]) -> None:
+        # Readers only ever see a complete filter: the old one until this
+        # assignment, the rebuilt one after it.
+        fresh.ready = self.revocations.ready
+        self.revocations = fresh
+        self.pending = None
+        for id in pending:
+            fresh.add(id)
+        # If live entries alone exceed capacity, rebuild less often rather
+        # than rescanning on every revocation.
+        self.rebuild_at = max(fresh.capacity, 2 * fresh.count)
+
+    def on_revoked(self, message: dict) -> None:
+        id = message["data"]
+        self.revoke(id.decode() if isinstance(id, bytes) else id)
+        if self.revocations.count > self.rebuild_at:
+            self.load_revocations()
+
+    def load_revocations(self) -> None:
+        # Rebuild from Redis so expired blacklist entries stop occupying bits.
+        # The listener thread and requests keep using the current filter
+        # until the rebuilt one is swapped in.
+        fresh, pending = self.revocations.empty(), []
+        self.pending = pending
+        try:
+            for key in self.redis.scan_iter(match="bl:*", count=1000):
+                key = key.decode() if isinstance(key, bytes) else key
+                fresh.add(key.removeprefix("bl:"))
+        except BaseException:
+            self.pending = None
+            raise
+        self.swap_revocations(fresh, pending)
+
+    def on_listener_error(self, e, pubsub, thread) -> None:
+        # Without the listener the filter goes stale; ask Redis every time.
+        self.revocations.ready = False
+        thread.stop()
+
+    def start_revocation_listener(self) -> None:
+        if self.revocations is None:
+            return
+
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before the initial scan so no revocation is missed.
+        pubsub.subscribe(**{self.channel: self.on_revoked})
+        self.load_revocations()
+        self.listener = pubsub.run_in_thread(
+            sleep_time=1.0,
+            daemon=True,
+            exception_handler=self.on_listener_error,
+        )
+        self.revocations.ready = True
+
+    def stop_revocation_listener(self) -> None:
+        if self.revocations is not None:
+            self.revocations.ready = False
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
 
     def rotate_tokens(
         self, refresh_token: str, iss: str = "auth.service", aud: str = "service"
@@ -150,3 +360,91 @@ class JWTManager(JWTService):
         payload: TokenPayload = self.verify_token(refresh_token)
         self.blacklist(payload.jti)
         return self.claim_tokens(sub=payload.sub, sid=payload.sid, iss=iss, aud=aud)
+
+
+class AsyncJWTManager(JWTManager):
+    # JWTManager on a redis.asyncio client: same token and blacklist layout,
+    # but every Redis call is awaited instead of blocking the event loop.
+
+    async def verify_token(
+        self, token: str, issuer: str | None = None, audience: str | None = None
+    ) -> TokenPayload:
+        payload = JWTService.verify_token(
+            self, token, issuer=issuer, audience=audience
+        )
+
+        if await self.is_revoked(payload):
+            raise HTTPException(status_code=401, detail="Token is blacklisted.")
+
+        return payload
+
+    async def is_revoked(self, payload: TokenPayload) -> bool:
+        if not self.may_be_revoked(payload):
+            return False
+        return (
+            await self.redis.exists(f"bl:{payload.sid}", f"bl:{payload.jti}") > 0
+        )
+
+    async def blacklist(self, id: str) -> None:
+        async with self.redis.pipeline() as pipe:
+            pipe.setex(f"bl:{id}", self.refresh_token_ttl, "blacklisted")
+            pipe.publish(self.channel, id)
+            await pipe.execute()
+        if self.revocations is not None:
+            self.revoke(id)
+
+    async def rotate_tokens(
+        self, refresh_token: str, iss: str = "auth.service", aud: str = "service"
+    ) -> dict:
+        payload: TokenPayload = await self.verify_token(refresh_token)
+        await self.blacklist(payload.jti)
+        return self.claim_tokens(sub=payload.sub, sid=payload.sid, iss=iss, aud=aud)
+
+    async def load_revocations(self) -> None:
+        # Requests keep checking the current filter while the scan awaits.
+        fresh, pending = self.revocations.empty(), []
+        self.pending = pending
+        try:
+            async for key in self.redis.scan_iter(match="bl:*", count=1000):
+                key = key.decode() if isinstance(key, bytes) else key
+                fresh.add(key.removeprefix("bl:"))
+        except BaseException:
+            self.pending = None
+            raise
+        self.swap_revocations(fresh, pending)
+
+    async def listen(self, pubsub) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                id = message["data"]
+                self.revoke(id.decode() if isinstance(id, bytes) else id)
+                if self.revocations.count > self.rebuild_at:
+                    await self.load_revocations()
+        finally:
+            # Without the listener the filter goes stale; ask Redis every time.
+            self.revocations.ready = False
+            await pubsub.aclose()
+
+    async def start_revocation_listener(self) -> None:
+        if self.revocations is None:
+            return
+
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before the initial scan so no revocation is missed.
+        await pubsub.subscribe(self.channel)
+        await self.load_revocations()
+        self.listener = asyncio.create_task(self.listen(pubsub))
+        self.revocations.ready = True
+
+    async def stop_revocation_listener(self) -> None:
+        if self.revocations is not None:
+            self.revocations.ready = False
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.listener = None
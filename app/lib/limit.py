@@ -0,0 +1,171 @@
+import asyncio
+import math
+import os
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+class TokenBucket:
+    # Per-identity token bucket kept in Redis, so the limit holds across
+    # replicas. Each identity gets `burst` tokens refilled at `rate` per
+    # second; a request spends one. When Redis is unavailable requests are
+    # let through (the concurrency limit still applies).
+
+    # KEYS: bucket. ARGV: rate, burst. Returns {allowed, retry_after_ms}.
+    # The clock is Redis' own, so replicas agree on it.
+    TAKE = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+    local tokens = tonumber(bucket[1]) or burst
+    local at = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + (now - at) * rate / 1000)
+    local allowed = 0
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    else
+        wait = math.ceil((1 - tokens) * 1000 / rate)
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+    return {allowed, wait}
+    """
+
+    # KEYS: bucket. ARGV: burst. Gives back one token, up to `burst`; a
+    # bucket that has expired is full already.
+    REFUND = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+    if tokens then
+        tokens = math.min(tonumber(ARGV[1]), tokens + 1)
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens))
+    end
+    return 1
+    """
+
+    def __init__(
+        self,
+        redis,
+        namespace: str,
+        rate: float = float(os.getenv("RATE_LIMIT_RATE", 0.5)),
+        burst: int = int(os.getenv("RATE_LIMIT_BURST", 10)),
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        self.rate = rate
+        self.burst = burst
+        self.take_script = redis.register_script(self.TAKE)
+        self.refund_script = redis.register_script(self.REFUND)
+        self.allowed = 0
+        self.limited = 0
+        self.refunded = 0
+        self.errors = 0
+
+    async def take(self, identity: str) -> int | None:
+        # None when allowed, otherwise the seconds to wait before retrying.
+        try:
+            allowed, wait = await self.take_script(
+                keys=[f"{self.namespace}:{identity}"], args=[self.rate, self.burst]
+            )
+        except Exception as e:
+            logger.warning(f"limit:{self.namespace}:take|{e}")
+            self.errors += 1
+            return None
+        if allowed:
+            self.allowed += 1
+            return None
+        self.limited += 1
+        return max(1, math.ceil(wait / 1000))
+
+    async def refund(self, identity: str) -> None:
+        # Returns the token of a request that was turned away before doing
+        # any work.
+        try:
+            await self.refund_script(
+                keys=[f"{self.namespace}:{identity}"], args=[self.burst]
+            )
+        except Exception as e:
+            logger.warning(f"limit:{self.namespace}:refund|{e}")
+            self.errors += 1
+            return
+        self.refunded += 1
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "refunded": self.refunded,
+            "errors": self.errors,
+        }
+
+
+class Admission:
+    # Caps concurrent work in this process. Up to `limit` callers run; up to
+    # `queue` more wait at most `timeout` seconds for a slot, and anyone
+    # beyond that is turned away immediately instead of piling up.
+
+    def __init__(
+        self,
+        limit: int = int(os.getenv("ADMISSION_LIMIT", 64)),
+        queue: int = int(os.getenv("ADMISSION_QUEUE", 128)),
+        timeout: float = float(os.getenv("ADMISSION_TIMEOUT", 5)),
+    ):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def acquire(self) -> bool:
+        # True once a slot is held; the caller must release() it.
+        if self.semaphore.locked():
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+        self.running += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.running -= 1
+        self.semaphore.release()
+
+    async def hold(self, generator):
+        # Re-yields `generator`, releasing the slot once it is exhausted or
+        # closed.
+        try:
+            async for item in generator:
+                yield item
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue": self.queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
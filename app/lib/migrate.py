@@ -0,0 +1,26 @@
+import os
+
+from sqlalchemy import text
+
+
+async def upgrade(engine, script_location: str, revision: str = "head") -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    DB_SCHEMA = os.getenv("DB_SCHEMA")
+    schema = f"msa_{DB_SCHEMA}"
+
+    def run(connection) -> None:
+        config = Config()
+        config.set_main_option("script_location", script_location)
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+    async with engine.begin() as conn:
+        # Replicas and the worker start together; only one migrates at a time.
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:schema))"),
+            {"schema": schema},
+        )
+        await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}";'))
+        await conn.run_sync(run)
@@ -15,20 +15,25 @@ class BaseModel(Base):
     id = Column(Text, primary_key=True, default=lambda: str(uuid.uuid4()))
     seq = Column(Integer, primary_key=True, autoincrement=True)
     created_at = Column(
-        DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
     )
     updated_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
         nullable=False,
     )
-    deleted_at = Column(DateTime, default=None, nullable=True)
+    deleted_at = Column(DateTime(timezone=True), default=None, nullable=True)
+
+    # Per-table Index/constraint objects, declared by concrete models.
+    __indexes__: tuple = ()
 
     @declared_attr
     def __table_args__(cls):
         DB_SCHEMA = os.getenv("DB_SCHEMA")
-        return {"schema": f"msa_{DB_SCHEMA}"}
+        return (*cls.__indexes__, {"schema": f"msa_{DB_SCHEMA}"})
 
     @declared_attr
     def __tablename__(cls):
@@ -0,0 +1,202 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    Text,
+    delete,
+    exists,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased
+
+from lib.model import BaseModel
+
+logger = getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 1))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", 60))
+
+
+class Outbox(BaseModel):
+    # Events waiting to be published. Rows are written in the same
+    # transaction as the entity they describe and deleted once Kafka has
+    # acknowledged them, so the table only holds the backlog.
+    __tablename__ = "outbox"
+    # The relay picks due rows in seq order and skips keys with an earlier
+    # row still backing off.
+    __indexes__ = (
+        Index("ix_outbox_available_at_seq", "available_at", "seq"),
+        Index("ix_outbox_key_seq", "key", "seq"),
+    )
+
+    topic = Column(Text, nullable=False)
+    key = Column(Text, nullable=True)
+    # json rather than jsonb: stored verbatim, so escapes such as \u0000 in
+    # message content are accepted.
+    value = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    last_error = Column(Text, nullable=True)
+
+
+def add_event(db: AsyncSession, topic: str, value: dict, key: str | None = None):
+    # Does not flush or commit; the event is published only if the caller's
+    # transaction commits.
+    db.add(Outbox(topic=topic, key=key, value=value))
+
+
+class OutboxRelay:
+    # Drains the outbox to Kafka in the background, in seq order. Only one
+    # replica drains at a time (transaction-scoped advisory lock) so events
+    # sharing a key reach their partition in seq order. seq is assigned at
+    # insert, not at commit: of two concurrent transactions, the one that
+    # inserted first may commit last and be relayed after the other, so
+    # writers that need per-key order must not write that key concurrently.
+    # A crash between the broker ack and the delete re-sends events
+    # (at-least-once).
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker,
+        producer,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        max_backoff: float = OUTBOX_MAX_BACKOFF,
+    ):
+        self.sessionmaker = sessionmaker
+        self.producer = producer
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.sent = 0
+        self.failed = 0
+
+    def notify(self) -> None:
+        # Called after a commit that added events so they go out right away
+        # instead of on the next poll.
+        self.wakeup.set()
+
+    async def drain(self) -> int:
+        # Publishes one batch and returns how many rows were delivered.
+        async with self.sessionmaker() as db, db.begin():
+            lock = f"{Outbox.__table__.schema}.{Outbox.__tablename__}"
+            result = await db.execute(
+                select(func.pg_try_advisory_xact_lock(func.hashtext(lock)))
+            )
+            if not result.scalar():
+                return 0
+
+            # A key whose earlier event is backing off waits for it, so
+            # retries never overtake.
+            now = datetime.now(timezone.utc)
+            earlier = aliased(Outbox)
+            blocked = exists().where(
+                earlier.key == Outbox.key,
+                earlier.seq < Outbox.seq,
+                earlier.available_at > now,
+            )
+            result = await db.execute(
+                select(Outbox)
+                .where(Outbox.available_at <= now, ~blocked)
+                .order_by(Outbox.seq)
+                .limit(self.batch_size)
+            )
+            rows = result.scalars().all()
+            if not rows:
+                return 0
+
+            # send() only enqueues into the producer's accumulator, so the
+            # whole batch shares broker round trips; acks are awaited after.
+            loop = asyncio.get_running_loop()
+            pending = []
+            for row in rows:
+                try:
+                    future = await self.producer.send(
+                        row.topic, value=row.value, key=row.key
+                    )
+                except Exception as e:
+                    future = loop.create_future()
+                    future.set_exception(e)
+                pending.append(future)
+            results = await asyncio.gather(*pending, return_exceptions=True)
+
+            delivered = []
+            failed_keys = set()
+            for row, result in zip(rows, results):
+                if row.key is not None and row.key in failed_keys:
+                    # Already sent, but behind a failed event for the same
+                    # key; resent after it so consumers end on the latest.
+                    row.available_at = datetime.now(timezone.utc)
+                    continue
+                if isinstance(result, Exception):
+                    failed_keys.add(row.key)
+                    row.attempts += 1
+                    row.last_error = str(result)
+                    backoff = min(2**row.attempts, self.max_backoff)
+                    row.available_at = datetime.now(timezone.utc) + timedelta(
+                        seconds=backoff
+                    )
+                    logger.warning(
+                        f"outbox:relay:retry|{row.topic}|{row.id}|{row.attempts}|{result}"
+                    )
+                else:
+                    delivered.append(row.seq)
+
+            if delivered:
+                await db.execute(delete(Outbox).where(Outbox.seq.in_(delivered)))
+            self.sent += len(delivered)
+            self.failed += len(rows) - len(delivered)
+            return len(delivered)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                while await self.drain() >= self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"outbox:relay:error|{e}")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        # Last attempt to flush what is already committed; anything left is
+        # picked up by the next process to start.
+        try:
+            await self.drain()
+        except Exception as e:
+            logger.warning(f"outbox:relay:stop|{e}")
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed}
@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, seq: int) -> str:
+    raw = json.dumps([created_at.isoformat(), seq]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, seq = json.loads(raw)
+        created_at, seq = datetime.fromisoformat(created_at), int(seq)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor is invalid.")
+    # Cursors are always issued with an offset; a naive timestamp cannot be
+    # compared with created_at (timestamptz), in SQL or in the message log.
+    if created_at.utcoffset() is None:
+        raise HTTPException(status_code=400, detail="Cursor is invalid.")
+    return created_at, seq
+
+
+def paginate(rows: list, limit: int) -> tuple[list, str | None]:
+    # Callers fetch limit + 1 rows (entities, result rows or dicts carrying
+    # created_at and seq) ordered by (created_at, seq), in either direction;
+    # the extra row only signals that another page exists.
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(last["created_at"], last["seq"])
+    return rows, encode_cursor(last.created_at, last.seq)
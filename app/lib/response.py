@@ -1,7 +1,8 @@
 import re
 from typing import Generic, TypeVar
 
-from fastapi.encoders import jsonable_encoder
+import orjson
+from fastapi.responses import JSONResponse as BaseJSONResponse
 from lib.utils import now
 from pydantic import BaseModel, Field
 
@@ -23,10 +24,42 @@ def create_model(T=None):
     return DataResponseModel[T]
 
 
+# Envelopes are plain dicts holding the raw values (datetimes, UUIDs, ...);
+# JSONResponse below encodes them in one pass, so nothing walks the data
+# beforehand. The pydantic models further down describe the same shapes
+# for response_model / OpenAPI.
 def create_response(message: str, data: any = None) -> dict:
     if data is None:
-        return jsonable_encoder(ResponseModel(message=message))
-    return jsonable_encoder(DataResponseModel(message=message, data=data))
+        return {"message": message, "timestamp": now()}
+    return {"message": message, "data": data, "timestamp": now()}
+
+
+def create_page_response(
+    message: str, data: any, next_cursor: str | None = None
+) -> dict:
+    return {
+        "message": message,
+        "data": data,
+        "next_cursor": next_cursor,
+        "timestamp": now(),
+    }
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError
+
+
+class JSONResponse(BaseJSONResponse):
+    # orjson encodes datetimes (UTC as "Z", like pydantic), UUIDs and enums
+    # natively; pydantic models fall back to model_dump().
+    def render(self, content: any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
 
 
 class ResponseModel(BaseModel):
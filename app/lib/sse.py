@@ -0,0 +1,58 @@
+import codecs
+import json
+
+
+class SSEParser:
+    # Incremental server-sent events parser. Bytes may be split anywhere,
+    # including inside a multi-byte UTF-8 sequence or an event boundary.
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.data: list[str] = []
+
+    def feed(self, chunk: bytes) -> list[str]:
+        # Returns the data payload of every event completed by this chunk.
+        self.buffer += self.decoder.decode(chunk)
+        events = []
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            line = line.removesuffix("\r")
+            if not line:
+                if self.data:
+                    events.append("\n".join(self.data))
+                    self.data = []
+            elif line.startswith("data:"):
+                self.data.append(line[5:].removeprefix(" "))
+        return events
+
+
+class ChatCompletionStream:
+    # Collects assistant delta content from an OpenAI-compatible
+    # chat.completion.chunk stream as the bytes arrive.
+
+    def __init__(self):
+        self.parser = SSEParser()
+        self.parts: list[str] = []
+        self.usage: dict | None = None
+        self.done = False
+
+    def feed(self, chunk: bytes) -> None:
+        for data in self.parser.feed(chunk):
+            if data == "[DONE]":
+                self.done = True
+                continue
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            if event.get("usage"):
+                self.usage = event["usage"]
+            for choice in event.get("choices") or []:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    self.parts.append(content)
+
+    @property
+    def content(self) -> str:
+        return "".join(self.parts)
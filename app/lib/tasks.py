@@ -0,0 +1,90 @@
+import asyncio
+import os
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+class KeyedQueue:
+    # Bounded in-process work queue drained by a fixed number of worker
+    # tasks, so at most `workers` handlers run at once. A key that is
+    # already queued or being handled is not queued again; when the queue
+    # is full new work is dropped rather than piling up behind a slow
+    # upstream.
+
+    def __init__(
+        self,
+        name: str,
+        handler,
+        workers: int = int(os.getenv("TASK_QUEUE_WORKERS", 2)),
+        maxsize: int = int(os.getenv("TASK_QUEUE_SIZE", 1000)),
+    ):
+        self.name = name
+        # handler(key, payload) is awaited once per accepted item.
+        self.handler = handler
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.pending: set[str] = set()
+        self.tasks: list[asyncio.Task] = []
+        self.running = 0
+        self.accepted = 0
+        self.deduped = 0
+        self.dropped = 0
+        self.done = 0
+        self.failed = 0
+
+    def put(self, key: str, payload=None) -> bool:
+        # Never blocks; returns whether the item was queued.
+        if key in self.pending:
+            self.deduped += 1
+            return False
+        try:
+            self.queue.put_nowait((key, payload))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"tasks:{self.name}:drop|{key}")
+            return False
+        self.pending.add(key)
+        self.accepted += 1
+        return True
+
+    async def work(self) -> None:
+        while True:
+            key, payload = await self.queue.get()
+            self.running += 1
+            try:
+                await self.handler(key, payload)
+                self.done += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"tasks:{self.name}:error|{key}|{e}")
+            finally:
+                self.running -= 1
+                self.pending.discard(key)
+                self.queue.task_done()
+
+    def start(self) -> None:
+        self.tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        # Queued work is in-memory only and is abandoned; callers re-submit
+        # it when the condition that triggered it still holds.
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "accepted": self.accepted,
+            "deduped": self.deduped,
+            "dropped": self.dropped,
+            "done": self.done,
+            "failed": self.failed,
+        }
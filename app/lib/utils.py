@@ -34,36 +34,40 @@ def create_event(data: any = None):
     )
 
 
-async def summarize(text: str, max_length: int = 100) -> str:
+async def summarize(text: str, max_length: int = 100, client=None) -> str:
     import httpx
     import os
 
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY environment variable not set")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "gpt-4o",
-                "messages": [
-                    {"role": "system", "content": "You are a title maker. Summarize the text and create a concise title."},
-                    {
-                        "role": "user",
-                        "content": f"Summarize the following text in {max_length} characters without punctuation marks.: {text}",
-                    },
-                ],
-                "max_tokens": max_length,
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"].strip()
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            return await summarize(text, max_length=max_length, client=client)
+
+    response = await client.post(
+        f"{OPENAI_BASE_URL}/chat/completions",
+        headers={
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": "You are a title maker. Summarize the text and create a concise title."},
+                {
+                    "role": "user",
+                    "content": f"Summarize the following text in {max_length} characters without punctuation marks.: {text}",
+                },
+            ],
+            "max_tokens": max_length,
+        },
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data["choices"][0]["message"]["content"].strip()
 
 
 def get_random_name(retry=0):
@@ -0,0 +1,44 @@
+import asyncio
+import os
+import sys
+
+import schemas.models as M
+from lib.explain import check_index_scans
+from lib.infra import get_async_engine, dispose_async_engines
+from lib.migrate import upgrade
+from main import ME_COLUMNS
+from sqlalchemy import select
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST")
+POSTGRES_PORT = os.getenv("POSTGRES_PORT")
+POSTGRES_DB = os.getenv("POSTGRES_DB")
+POSTGRES_USER = os.getenv("POSTGRES_USER")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+postgres_url = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "migrations")
+
+ID = "00000000-0000-0000-0000-000000000000"
+
+# The statements behind each hot endpoint, as main.py builds them, with
+# placeholder values.
+queries = {
+    "login": select(M.User).where(M.User.email == "user@example.com"),
+    "register:email": select(M.User.id).where(M.User.email == "user@example.com"),
+    "register:usernames": select(M.User.username).where(
+        M.User.username.in_(["name_1000", "name_1001"])
+    ),
+    "me": select(*ME_COLUMNS).where(M.User.id == ID),
+    "me:update": select(M.User).where(M.User.id == ID),
+}
+
+async def main() -> int:
+    engine = get_async_engine(url=postgres_url)
+    try:
+        await upgrade(engine, MIGRATIONS)
+        return 0 if await check_index_scans(engine, queries) else 1
+    finally:
+        await dispose_async_engines()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -5,17 +5,20 @@ from contextlib import asynccontextmanager
 
 import schemas.models as M
 import schemas.payloads as P
-from fastapi import Cookie, Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from lib.cache import ProfileCache
+from lib.executor import BoundedExecutor
 from lib.infra import *
 from lib.jwt import *
 from lib.middleware import *
+from lib.migrate import upgrade
+from lib.outbox import OutboxRelay, add_event
+from lib.response import JSONResponse, create_model, create_response
 from lib.utils import *
-from lib.model import Base
-from lib.response import create_model, create_response
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import Session
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 APP_ENV = os.getenv("APP_ENV")
 
@@ -34,33 +37,38 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-postgres_url = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-get_db = new_db(url=postgres_url)
-db = new_db_session(url=postgres_url)
-engine = create_engine(url=postgres_url)
+postgres_url = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+engine = get_async_engine(url=postgres_url, name="auth")
+SessionLocal = get_async_sessionmaker(url=postgres_url)
+get_db = new_async_db(url=postgres_url)
 assert DB_SCHEMA
-db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "msa_{DB_SCHEMA}";'))
-db.commit()
-Base.metadata.create_all(bind=engine)
-
-if not db.query(M.User).filter(M.User.email == SU_EMAIL).first():
-    user = M.User(
-        email=SU_EMAIL,
-        username="superuser",
-        name="Super User",
-        role="superuser",
-        hashed_password=hash_password(SU_PASSWORD),
-        is_active=True,
-        change_password_on_next_login=False,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "migrations")
+
+
+async def bootstrap() -> None:
+    await upgrade(engine, MIGRATIONS)
+
+    async with SessionLocal() as db:
+        result = await db.execute(select(M.User).where(M.User.email == SU_EMAIL))
+        if result.scalars().first():
+            return
+
+        user = M.User(
+            email=SU_EMAIL,
+            username="superuser",
+            name="Super User",
+            role="superuser",
+            hashed_password=hash_password(SU_PASSWORD, BCRYPT_COST),
+            is_active=True,
+            change_password_on_next_login=False,
+        )
+        db.add(user)
+        await db.commit()
 
 # Redis
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
-redis = new_redis(host=REDIS_HOST, port=REDIS_PORT)
+redis = new_async_redis(host=REDIS_HOST, port=REDIS_PORT)
 
 # s3
 AWS_S3_REGION = os.getenv("AWS_S3_REGION")
@@ -75,22 +83,71 @@ s3 = new_s3(
 )
 
 # Jwt
-jwt = JWTManager(redis=redis)
+jwt = AsyncJWTManager(
+    redis=redis, cache=TokenCache(), revocations=RevocationFilter()
+)
+
+# Profiles served by GET /me; invalidated wherever those fields change.
+profiles = ProfileCache(redis, namespace="auth:profile")
+ME_COLUMNS = tuple(getattr(M.User, name) for name in P.Me.model_fields)
+
+# Bcrypt
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", 12))
+BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS", os.cpu_count() or 1))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 64))
+hasher = BoundedExecutor(
+    max_workers=BCRYPT_MAX_WORKERS, max_queue=BCRYPT_MAX_QUEUE, name="bcrypt"
+)
+
+# Usernames
+USERNAME_CANDIDATES = int(os.getenv("USERNAME_CANDIDATES", 16))
+
+
+async def free_usernames(db: AsyncSession) -> list[str]:
+    # One query checks a whole batch of random candidates, so the number of
+    # round trips does not grow with the size of the users table.
+    candidates = list(
+        {
+            get_random_name() + "_" + str(random.randint(1000, 9999))
+            for _ in range(USERNAME_CANDIDATES)
+        }
+    )
+    result = await db.execute(
+        select(M.User.username).where(M.User.username.in_(candidates))
+    )
+    taken = set(result.scalars().all())
+    return [c for c in candidates if c not in taken]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await bootstrap()
+    await jwt.start_revocation_listener()
+    await profiles.start_listener()
+
     KAFKA_BROKER_URL = os.getenv("KAFKA_BROKER_URL")
     producer = new_kafka_producer(bootstrap_servers=[KAFKA_BROKER_URL])
     await producer.start()
     app.state.producer = producer
+    app.state.outbox = OutboxRelay(SessionLocal, producer)
+    app.state.outbox.start()
     try:
         yield
     finally:
+        await app.state.outbox.stop()
         await producer.stop()
+        await dispose_async_engines()
+        hasher.shutdown()
+        await jwt.stop_revocation_listener()
+        await profiles.stop_listener()
+        await redis.aclose()
 
 
-app = FastAPI(root_path="/api/v1/auth", lifespan=lifespan)
+app = FastAPI(
+    root_path="/api/v1/auth",
+    lifespan=lifespan,
+    default_response_class=JSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -107,64 +164,110 @@ app.add_middleware(
 
 
 @app.get("/healthz", response_model=create_model())
-def healthz(db: Session = Depends(get_db)):
+async def healthz(db: AsyncSession = Depends(get_db)):
     message = "Auth service is healthy."
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
     except Exception as e:
         message = str(e)
 
     return JSONResponse(create_response(message), 200)
 
 
+@app.get("/metrics")
+async def metrics(
+    request: Request,
+    tokens: dict = Depends(get_tokens),
+    db: AsyncSession = Depends(get_db),
+):
+    # Pool, cache and revocation internals are for superusers only.
+    token = tokens.get("access_token") or tokens.get("bearer_token") or None
+    if not token:
+        return JSONResponse(create_response("Token is required."), 401)
+
+    payload = await jwt.verify_token(
+        token, issuer="auth.service", audience="service"
+    )
+    role = await db.scalar(select(M.User.role).where(M.User.id == payload.sub))
+    if role != "superuser":
+        return JSONResponse(create_response("Forbidden."), 403)
+
+    return JSONResponse(
+        create_response(
+            "Metrics retrieved successfully.",
+            {
+                "db": get_pool_stats(),
+                "outbox": request.app.state.outbox.stats(),
+                "bcrypt": hasher.stats(),
+                "jwt": jwt.cache.stats(),
+                "profiles": profiles.stats(),
+                "revocations": jwt.revocations.stats(),
+            },
+        ),
+        200,
+    )
+
+
 @app.post("/register", response_model=create_model(P.Tokens))
 async def register(
-    request: Request, body: P.AuthCredentials, db: Session = Depends(get_db)
+    request: Request, body: P.AuthCredentials, db: AsyncSession = Depends(get_db)
 ):
-    existing_user = db.query(M.User).filter(M.User.email == body.email).first()
+    result = await db.execute(select(M.User).where(M.User.email == body.email))
+    existing_user = result.scalars().first()
     if existing_user:
         return JSONResponse(create_response("Email already exists."), 409)
 
-    username = ""
-    while True:
-        username = get_random_name() + "_" + str(random.randint(1000, 9999))
-        if db.query(M.User).filter(M.User.username == username).first() is None:
+    hashed_password = await hasher.run(hash_password, body.password, BCRYPT_COST)
+
+    user = None
+    while user is None:
+        for username in await free_usernames(db):
+            candidate = M.User(
+                email=body.email,
+                username=username,
+                hashed_password=hashed_password,
+                is_active=True,
+                is_first_login=True,
+                change_password_on_next_login=False,
+            )
+            # A concurrent registration may claim the same username (or
+            # email) between the check and the insert; the savepoint keeps
+            # the transaction usable so the next candidate can be tried.
+            try:
+                async with db.begin_nested():
+                    db.add(candidate)
+            except IntegrityError:
+                result = await db.execute(
+                    select(M.User.id).where(M.User.email == body.email)
+                )
+                if result.first() is not None:
+                    return JSONResponse(create_response("Email already exists."), 409)
+                continue
+            user = candidate
             break
 
-    hashed_password = hash_password(body.password)
-    user = M.User(
-        email=body.email,
-        username=username,
-        hashed_password=hashed_password,
-        is_active=True,
-        is_first_login=True,
-        change_password_on_next_login=False,
+    add_event(
+        db, "auth.user.registered", create_event(user.to_dict()), key=user.id
     )
-
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    try:
-        await request.app.state.producer.send_and_wait(
-            "auth.user.registered", key=None, value=create_event(user.to_dict())
-        )
-    except Exception as e:
-        return JSONResponse(create_response(str(e)), 500)
+    await db.commit()
+    request.app.state.outbox.notify()
 
     return JSONResponse(create_response("User registered."), 201)
 
 
 @app.post("/login", response_model=P.Tokens)
 async def login(
-    request: Request, body: P.AuthCredentials, db: Session = Depends(get_db)
+    request: Request, body: P.AuthCredentials, db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(M.User).filter(M.User.email == body.email).first()
+    result = await db.execute(select(M.User).where(M.User.email == body.email))
+    user = result.scalars().first()
     logger.debug(user.to_dict() if user else "User not found")
-    if user is not None and verify_password(body.password, user.hashed_password):
+    if user is not None and await hasher.run(
+        verify_password, body.password, user.hashed_password
+    ):
         user.last_login_at = now()
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     else:
         return JSONResponse(create_response("Invalid email or password."), 401)
 
@@ -204,11 +307,13 @@ async def login(
 async def logout(request: Request, tokens: dict = Depends(get_tokens)):
     token = tokens.get("access_token") or tokens.get("bearer_token") or None
     try:
-        payload = jwt.verify_token(token, issuer="auth.service", audience="service")
+        payload = await jwt.verify_token(
+            token, issuer="auth.service", audience="service"
+        )
     except Exception as e:
         raise e
 
-    jwt.blacklist(payload.sid)
+    await jwt.blacklist(payload.sid)
     res = JSONResponse(create_response("Logged out successfully."), 200)
     res.set_cookie(
         key="access_token",
@@ -237,7 +342,7 @@ async def logout(request: Request, tokens: dict = Depends(get_tokens)):
 @app.post("/refresh", response_model=P.AccessToken)
 async def refresh(request: Request, tokens: dict = Depends(get_tokens)):
     token = tokens.get("refresh_token") or tokens.get("bearer_token") or None
-    refreshed_tokens = jwt.rotate_tokens(
+    refreshed_tokens = await jwt.rotate_tokens(
         refresh_token=token, iss="auth.service", aud="service"
     )
 
@@ -272,34 +377,27 @@ async def refresh(request: Request, tokens: dict = Depends(get_tokens)):
 
 
 @app.get("/me", response_model=P.Me)
-async def get_me(tokens: str = Depends(get_tokens), db: Session = Depends(get_db)):
+async def get_me(
+    tokens: str = Depends(get_tokens), db: AsyncSession = Depends(get_db)
+):
     token = tokens.get("access_token") or tokens.get("bearer_token") or None
     if not token:
         return JSONResponse(create_response("Token is required."), 401)
 
-    payload = jwt.verify_token(token, issuer="auth.service", audience="service")
-    user = db.query(M.User).filter(M.User.id == payload.sub).first()
+    payload = await jwt.verify_token(
+        token, issuer="auth.service", audience="service"
+    )
 
-    if not user:
+    async def load(id: str) -> dict | None:
+        result = await db.execute(select(*ME_COLUMNS).where(M.User.id == id))
+        row = result.first()
+        return row._asdict() if row else None
+
+    me = await profiles.get(payload.sub, load)
+    if not me:
         return JSONResponse(create_response("User not found."), 404)
 
-    return JSONResponse(
-        create_response(
-            "User retrieved successfully.",
-            P.Me(
-                email=user.email,
-                username=user.username,
-                name=user.name,
-                bio=user.bio,
-                profile_url=user.profile_url,
-                role=user.role,
-                is_first_login=user.is_first_login,
-                is_active=user.is_active,
-                change_password_on_next_login=user.change_password_on_next_login,
-            ),
-        ),
-        200,
-    )
+    return JSONResponse(create_response("User retrieved successfully.", me), 200)
 
 
 @app.post("/me", response_model=P.Me)
@@ -307,14 +405,17 @@ async def update_me(
     request: Request,
     body: P.UpdateMe,
     tokens: dict = Depends(get_tokens),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     token = tokens.get("access_token") or tokens.get("bearer_token") or None
     if not token:
         return JSONResponse(create_response("Token is required."), 401)
 
-    payload = jwt.verify_token(token, issuer="auth.service", audience="service")
-    user = db.query(M.User).filter(M.User.id == payload.sub).first()
+    payload = await jwt.verify_token(
+        token, issuer="auth.service", audience="service"
+    )
+    result = await db.execute(select(M.User).where(M.User.id == payload.sub))
+    user = result.scalars().first()
 
     if not user:
         return JSONResponse(create_response("User not found."), 404)
@@ -324,15 +425,13 @@ async def update_me(
     user.bio = body.bio or user.bio
     user.is_active = body.is_active or user.is_active
 
-    db.commit()
-    db.refresh(user)
-
-    try:
-        await request.app.state.producer.send_and_wait(
-            "auth.user.updated", key=None, value=create_event(user.to_dict())
-        )
-    except Exception as e:
-        return JSONResponse(create_response(str(e)), 500)
+    # Flushed first so the event carries the new updated_at.
+    await db.flush()
+    await db.refresh(user)
+    add_event(db, "auth.user.updated", create_event(user.to_dict()), key=user.id)
+    await db.commit()
+    request.app.state.outbox.notify()
+    await profiles.invalidate(user.id)
 
     return JSONResponse(
         create_response(
@@ -357,21 +456,28 @@ async def update_me(
 async def change_password(
     body: P.ChangePassword,
     tokens: dict = Depends(get_tokens),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     token = tokens.get("access_token") or tokens.get("bearer_token") or None
     if not token:
         return JSONResponse(create_response("Token is required."), 401)
 
-    payload = jwt.verify_token(token, issuer="auth.service", audience="service")
-    user = db.query(M.User).filter(M.User.id == payload.sub).first()
-    if not user or not verify_password(body.old_password, user.hashed_password):
+    payload = await jwt.verify_token(
+        token, issuer="auth.service", audience="service"
+    )
+    result = await db.execute(select(M.User).where(M.User.id == payload.sub))
+    user = result.scalars().first()
+    if not user or not await hasher.run(
+        verify_password, body.old_password, user.hashed_password
+    ):
         return JSONResponse(
             create_response("User not found or old password incorrect."), 404
         )
 
-    user.hashed_password = hash_password(body.new_password)
-    db.commit()
-    db.refresh(user)
+    user.hashed_password = await hasher.run(
+        hash_password, body.new_password, BCRYPT_COST
+    )
+    await db.commit()
+    await db.refresh(user)
 
     return JSONResponse(create_response("Password changed successfully."), 200)
@@ -0,0 +1,81 @@
+"""initial
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = f"msa_{os.getenv('DB_SCHEMA')}"
+
+
+def base_columns() -> list:
+    return [
+        sa.Column("id", sa.Text(), nullable=False),
+        sa.Column("seq", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+    ]
+
+
+def to_timestamptz(inspector, table: str) -> None:
+    # create_all-era tables have naive timestamp columns holding UTC; the
+    # models now write aware datetimes, which asyncpg rejects for those.
+    for column in inspector.get_columns(table, schema=SCHEMA):
+        if isinstance(column["type"], sa.DateTime) and not column["type"].timezone:
+            name = column["name"]
+            op.alter_column(
+                table,
+                name,
+                type_=sa.DateTime(timezone=True),
+                postgresql_using=f"\"{name}\" AT TIME ZONE 'UTC'",
+                schema=SCHEMA,
+            )
+
+
+def upgrade() -> None:
+    # Databases bootstrapped with create_all already have this table.
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("users", schema=SCHEMA):
+        to_timestamptz(inspector, "users")
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("email", sa.Text(), nullable=False),
+        sa.Column("username", sa.Text(), nullable=False),
+        sa.Column("hashed_password", sa.Text(), nullable=True),
+        sa.Column("name", sa.Text(), nullable=True),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("profile_url", sa.Text(), nullable=True),
+        sa.Column("role", sa.Text(), nullable=False),
+        sa.Column("sso_provider", sa.Text(), nullable=True),
+        sa.Column("sso_id", sa.Text(), nullable=True),
+        sa.Column("is_first_login", sa.Boolean(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("change_password_on_next_login", sa.Boolean(), nullable=False),
+        sa.Column("last_login_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "last_password_change_at", sa.DateTime(timezone=True), nullable=True
+        ),
+        *base_columns(),
+        sa.PrimaryKeyConstraint("seq", "id"),
+        sa.UniqueConstraint("email"),
+        sa.UniqueConstraint("username"),
+        schema=SCHEMA,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("users", schema=SCHEMA)
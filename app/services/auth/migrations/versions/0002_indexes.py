@@ -0,0 +1,29 @@
+"""indexes for hot lookups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = f"msa_{os.getenv('DB_SCHEMA')}"
+
+
+def upgrade() -> None:
+    # The primary key is (seq, id), so it cannot serve lookups by id alone.
+    op.create_index(
+        "ix_users_id", "users", ["id"], schema=SCHEMA, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_id", table_name="users", schema=SCHEMA)
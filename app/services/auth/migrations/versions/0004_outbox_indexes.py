@@ -0,0 +1,35 @@
+"""index the outbox columns the relay filters on
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = f"msa_{os.getenv('DB_SCHEMA')}"
+
+INDEXES = {
+    # Due rows, in relay order.
+    "ix_outbox_available_at_seq": ["available_at", "seq"],
+    # Earlier rows of the same key, for the backing-off check.
+    "ix_outbox_key_seq": ["key", "seq"],
+}
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, "outbox", columns, schema=SCHEMA)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="outbox", schema=SCHEMA)
@@ -1,9 +1,12 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, Text, String
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, Text, String
 
 from lib.model import BaseModel
+from lib.outbox import Outbox  # noqa: F401 - shares the service schema
 
 
 class User(BaseModel):
+    __indexes__ = (Index("ix_users_id", "id"),)
+
     email = Column(Text, nullable=False, unique=True)
     username = Column(Text, nullable=False, unique=True)
     hashed_password = Column(Text, nullable=True)
@@ -19,5 +22,5 @@ class User(BaseModel):
     is_first_login = Column(Boolean, nullable=False, default=False)
     is_active = Column(Boolean, nullable=False, default=True)
     change_password_on_next_login = Column(Boolean, nullable=False, default=False)
-    last_login_at = Column(DateTime, nullable=True)
-    last_password_change_at = Column(DateTime, nullable=True)
+    last_login_at = Column(DateTime(timezone=True), nullable=True)
+    last_password_change_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+
+import schemas.models as M
+from lib.explain import check_index_scans
+from lib.infra import get_async_engine, dispose_async_engines
+from lib.migrate import upgrade
+from main import CONVERSATION_COLUMNS, MESSAGE_COLUMNS, PAGE_SIZE, PROFILE_COLUMNS
+from datetime import datetime, timezone
+
+from sqlalchemy import or_, select, tuple_, update
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST")
+POSTGRES_PORT = os.getenv("POSTGRES_PORT")
+POSTGRES_DB = os.getenv("POSTGRES_DB")
+POSTGRES_USER = os.getenv("POSTGRES_USER")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+postgres_url = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "migrations")
+
+ID = "00000000-0000-0000-0000-000000000000"
+CURSOR = (datetime(2000, 1, 1, tzinfo=timezone.utc), 0)
+
+# The statements behind each hot endpoint, as main.py builds them, with
+# placeholder ids.
+untitled = or_(M.Conversation.title.is_(None), M.Conversation.title == "")
+queries = {
+    "completions:user": select(*PROFILE_COLUMNS).filter_by(user_id=ID),
+    "completions:conversation": select(M.Conversation).filter_by(id=ID),
+    "completions:last_message": select(*MESSAGE_COLUMNS)
+    .filter_by(conversation_id=ID)
+    .order_by(M.Message.created_at.desc(), M.Message.seq.desc())
+    .limit(1),
+    "completions:prepared_message": select(M.Message).filter_by(seq=0, id=ID),
+    "set_title:check": select(M.Conversation.id).where(
+        M.Conversation.id == ID, untitled
+    ),
+    "set_title:update": update(M.Conversation)
+    .where(M.Conversation.id == ID, untitled)
+    .values(title="title"),
+    "list": select(*CONVERSATION_COLUMNS)
+    .filter_by(user_id=ID)
+    .order_by(M.Conversation.created_at.desc(), M.Conversation.seq.desc())
+    .limit(PAGE_SIZE + 1),
+    "list:next": select(*CONVERSATION_COLUMNS)
+    .filter_by(user_id=ID)
+    .order_by(M.Conversation.created_at.desc(), M.Conversation.seq.desc())
+    .limit(PAGE_SIZE + 1)
+    .where(tuple_(M.Conversation.created_at, M.Conversation.seq) < CURSOR),
+    "list/{id}:conversation": select(*CONVERSATION_COLUMNS).filter_by(
+        id=ID, user_id=ID
+    ),
+    "list/{id}:messages": select(*MESSAGE_COLUMNS)
+    .filter_by(conversation_id=ID)
+    .order_by(M.Message.created_at.desc(), M.Message.seq.desc())
+    .limit(PAGE_SIZE + 1),
+    "list/{id}:messages:next": select(*MESSAGE_COLUMNS)
+    .filter_by(conversation_id=ID)
+    .order_by(M.Message.created_at.desc(), M.Message.seq.desc())
+    .limit(PAGE_SIZE + 1)
+    .where(tuple_(M.Message.created_at, M.Message.seq) < CURSOR),
+}
+
+async def main() -> int:
+    engine = get_async_engine(url=postgres_url)
+    try:
+        await upgrade(engine, MIGRATIONS)
+        return 0 if await check_index_scans(engine, queries) else 1
+    finally:
+        await dispose_async_engines()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,23 +1,35 @@
-import json
+import hashlib
 import logging
 import os
 from contextlib import asynccontextmanager
-import asyncio
 
-import httpx
+import orjson
 import schemas.models as M
 import schemas.payloads as P
-from fastapi import Depends, FastAPI, Request
+from fastapi import Depends, FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import StreamingResponse
+from lib.cache import MessageLog, ProfileCache
+from lib.flight import SingleFlight
 from lib.infra import *
 from lib.jwt import *
-from lib.utils import *
+from lib.limit import Admission, TokenBucket
 from lib.middleware import get_tokens
-from lib.model import Base
-from lib.response import create_model, create_response
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import Session
+from lib.migrate import upgrade
+from lib.outbox import OutboxRelay, add_event
+from lib.pagination import decode_cursor, paginate
+from lib.response import (
+    JSONResponse,
+    create_model,
+    create_page_response,
+    create_response,
+)
+from lib.sse import ChatCompletionStream
+from lib.tasks import KeyedQueue
+from lib.utils import *
+from prompt import PromptStats, developer_message
+from sqlalchemy import or_, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 APP_ENV = os.getenv("APP_ENV")
 
@@ -32,32 +44,119 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-postgres_url = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-get_db = new_db(url=postgres_url)
-db = new_db_session(url=postgres_url)
-engine = create_engine(url=postgres_url)
+postgres_url = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+engine = get_async_engine(url=postgres_url, name="conversation")
+SessionLocal = get_async_sessionmaker(url=postgres_url)
+get_db = new_async_db(url=postgres_url)
 assert DB_SCHEMA
-db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "msa_{DB_SCHEMA}";'))
-db.commit()
-Base.metadata.create_all(bind=engine)
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "migrations")
+
+
+async def bootstrap() -> None:
+    await upgrade(engine, MIGRATIONS)
+
+# OpenAI-compatible upstream, e.g. bench/fake_llm.py for load tests
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+# Redis
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = os.getenv("REDIS_PORT")
+redis = new_async_redis(host=REDIS_HOST, port=REDIS_PORT)
 
 # Jwt
-jwt = JWTService()
+jwt = JWTService(cache=TokenCache())
+
+# User profiles projected from auth events, read on every chat turn. The
+# worker invalidates them as auth.user.* events are applied.
+profiles = ProfileCache(redis, namespace="conversation:profile")
+PROFILE_COLUMNS = (
+    M.User.user_id,
+    M.User.email,
+    M.User.username,
+    M.User.name,
+    M.User.bio,
+    M.User.profile_url,
+    M.User.role,
+)
+
+# Recent messages per conversation, written through on insert. Thread loads
+# and last-message lookups fall back to Postgres when it has no answer.
+history = MessageLog(redis, namespace="conversation:messages")
+
+# In-flight completions keyed by conversation and request body, so a
+# double-submit or retry streams the running generation instead of starting
+# another one.
+flights = SingleFlight(redis, namespace="conversation:flight")
+
+# Completions per user (or client IP when anonymous), shared across
+# replicas, and concurrent upstream streams in this replica.
+rate_limit = TokenBucket(redis, namespace="conversation:ratelimit")
+admission = Admission()
+# Retry-After sent when the replica is saturated.
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 2))
+
+# Prompt sizes and upstream prefix-cache hits
+prompts = PromptStats()
+
+# Pagination
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 200))
+
+# Columns served by the read endpoints. Rows are serialized as-is instead of
+# hydrating entities; created_at and seq are always needed for the cursor.
+CONVERSATION_COLUMNS = (
+    M.Conversation.id,
+    M.Conversation.seq,
+    M.Conversation.title,
+    M.Conversation.created_at,
+    M.Conversation.updated_at,
+)
+MESSAGE_COLUMNS = (
+    M.Message.id,
+    M.Message.seq,
+    M.Message.parent_id,
+    M.Message.role,
+    M.Message.content,
+    M.Message.created_at,
+)
+
+
+def message_row(message: M.Message) -> dict:
+    # Same shape as a MESSAGE_COLUMNS result row.
+    return {column.key: getattr(message, column.key) for column in MESSAGE_COLUMNS}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await bootstrap()
+    await profiles.start_listener()
+
     KAFKA_BROKER_URL = os.getenv("KAFKA_BROKER_URL")
     producer = new_kafka_producer(bootstrap_servers=[KAFKA_BROKER_URL])
     await producer.start()
     app.state.producer = producer
+    app.state.outbox = OutboxRelay(SessionLocal, producer)
+    app.state.outbox.start()
+    app.state.http = new_http_client(name="upstream")
+    titles.start()
     try:
         yield
     finally:
+        await flights.stop()
+        await titles.stop()
+        await app.state.outbox.stop()
         await producer.stop()
+        await app.state.http.aclose()
+        await dispose_async_engines()
+        await profiles.stop_listener()
+        await redis.aclose()
 
 
-app = FastAPI(root_path="/api/v1/conversation", lifespan=lifespan)
+app = FastAPI(
+    root_path="/api/v1/conversation",
+    lifespan=lifespan,
+    default_response_class=JSONResponse,
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -85,32 +184,91 @@ app.add_middleware(
 
 
 @app.get("/healthz", response_model=create_model())
-def healthz(db: Session = Depends(get_db)):
+async def healthz(db: AsyncSession = Depends(get_db)):
     message = "Conversation service is healthy."
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
     except Exception as e:
         message = str(e)
 
     return JSONResponse(create_response(message), 200)
 
 
-async def set_title(db: Session, conv: M.Conversation, text: str):
-    try:
-        title = await summarize(text=text, max_length=30)
-        conv.title = title
-        db.add(conv)
-        db.commit()
-        db.refresh(conv)
-    except Exception as e:
-        logger.exception("set_title_async failed: %s", e)
+@app.get("/metrics")
+async def metrics(
+    request: Request,
+    tokens: dict = Depends(get_tokens),
+    db: AsyncSession = Depends(get_db),
+):
+    # Pool, cache and limiter internals are for superusers only.
+    token = tokens.get("access_token") or tokens.get("bearer_token") or None
+    if not token:
+        return JSONResponse(create_response("Token is required."), 401)
+
+    payload = jwt.verify_token(token, issuer="auth.service", audience="service")
+    role = await db.scalar(select(M.User.role).filter_by(user_id=payload.sub))
+    if role != "superuser":
+        return JSONResponse(create_response("Forbidden."), 403)
+
+    return JSONResponse(
+        create_response(
+            "Metrics retrieved successfully.",
+            {
+                "db": get_pool_stats(),
+                "outbox": request.app.state.outbox.stats(),
+                "jwt": jwt.cache.stats(),
+                "profiles": profiles.stats(),
+                "history": history.stats(),
+                "flights": flights.stats(),
+                "rate_limit": rate_limit.stats(),
+                "admission": admission.stats(),
+                "prompt": prompts.stats(),
+                "titles": titles.stats(),
+                "http": get_http_stats(),
+            },
+        ),
+        200,
+    )
+
+
+async def set_title(conversation_id: str, text: str):
+    # Runs on the title queue, after the request that asked for it is gone.
+    untitled = or_(M.Conversation.title.is_(None), M.Conversation.title == "")
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(M.Conversation.id).where(
+                M.Conversation.id == conversation_id, untitled
+            )
+        )
+        if result.first() is None:
+            return
+    title = await summarize(text=text, max_length=30, client=app.state.http)
+    async with SessionLocal() as db:
+        # Only fills an empty title; a concurrent rename or an earlier
+        # attempt that landed wins.
+        await db.execute(
+            update(M.Conversation)
+            .where(M.Conversation.id == conversation_id, untitled)
+            .values(title=title)
+        )
+        await db.commit()
+
+
+# Title generation: one pending job per conversation, at most TITLE_WORKERS
+# summarize calls in flight.
+titles = KeyedQueue(
+    "titles",
+    set_title,
+    workers=int(os.getenv("TITLE_WORKERS", 2)),
+    maxsize=int(os.getenv("TITLE_QUEUE_SIZE", 1000)),
+)
 
 
 @app.post("/prepare")
 async def prepare(
     body: P.Conversation,
     tokens: dict = Depends(get_tokens),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
 
     token = tokens.get("access_token") or tokens.get("bearer_token") or None
@@ -126,8 +284,8 @@ async def prepare(
         user_id=sub if sub else None,
     )
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
 
     user_message = M.Message(
         parent_id=None,
@@ -136,8 +294,9 @@ async def prepare(
         content=body.messages[-1].content,
     )
     db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
+    await db.commit()
+    await db.refresh(user_message)
+    await history.append(conversation.id, message_row(user_message), create=True)
 
     return JSONResponse(
         create_response(
@@ -152,7 +311,7 @@ async def completions(
     request: Request,
     body: P.Conversation,
     tokens: dict = Depends(get_tokens),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     logger.debug(">>>>>>>>>>>>>>>>>>>>>>>>>>")
     logger.debug(body)
@@ -166,59 +325,135 @@ async def completions(
     except:
         pass
 
-    user = db.query(M.User).filter_by(user_id=sub).first() if sub else None
+    # nginx sets X-Real-IP to the peer address.
+    identity = sub or request.headers.get("x-real-ip") or request.client.host
+    retry_after = await rate_limit.take(identity)
+    if retry_after is not None:
+        return JSONResponse(
+            create_response("Too many requests.", None),
+            429,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    digest = hashlib.sha256(
+        orjson.dumps([sub, [m.model_dump() for m in body.messages]])
+    ).hexdigest()
+    flight, leader = await flights.acquire(f"{body.conversation_id}:{digest}")
+    if leader:
+        # Only leaders open an upstream stream, so only they take a slot.
+        admitted = False
+        try:
+            admitted = await admission.acquire()
+            if admitted:
+                generator = await start_completion(request, body, sub, db)
+        except BaseException:
+            if admitted:
+                admission.release()
+            await flights.abandon(flight)
+            raise
+        if not admitted:
+            await flights.abandon(flight)
+            # Turned away for our load, not theirs: give the token back.
+            await rate_limit.refund(identity)
+            return JSONResponse(
+                create_response("Service is busy, try again later.", None),
+                503,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+            )
+        flights.start(flight, admission.hold(generator))
+
+    return StreamingResponse(
+        flight.subscribe(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+async def start_completion(
+    request: Request, body: P.Conversation, sub: str | None, db: AsyncSession
+):
+    # Writes the user turn and returns the upstream stream; runs once per
+    # flight, and the stream outlives the request.
+    async def load_profile(id: str) -> dict | None:
+        result = await db.execute(select(*PROFILE_COLUMNS).filter_by(user_id=id))
+        row = result.first()
+        return row._asdict() if row else None
 
-    prev_conversation = (
-        db.query(M.Conversation).filter_by(id=body.conversation_id).first()
+    user = await profiles.get(sub, load_profile) if sub else None
+
+    result = await db.execute(
+        select(M.Conversation).filter_by(id=body.conversation_id)
     )
+    prev_conversation = result.scalars().first()
     if sub and prev_conversation:
         prev_conversation.user_id = sub
         db.add(prev_conversation)
-        db.commit()
-        db.refresh(prev_conversation)
+        await db.commit()
+        await db.refresh(prev_conversation)
 
     prev_message = None
+    new_conversation = prev_conversation is None
     if prev_conversation:
-        prev_message = (
-            db.query(M.Message)
-            .filter_by(conversation_id=body.conversation_id)
-            .order_by(M.Message.created_at.desc())
-            .first()
-        )
+        prev_message = await history.last(body.conversation_id)
+        if prev_message is None:
+            result = await db.execute(
+                select(*MESSAGE_COLUMNS)
+                .filter_by(conversation_id=body.conversation_id)
+                .order_by(M.Message.created_at.desc(), M.Message.seq.desc())
+                .limit(1)
+            )
+            row = result.first()
+            prev_message = row._asdict() if row else None
     else:
         prev_conversation = M.Conversation(
             id=body.conversation_id,
             user_id=sub if sub else None,
         )
         db.add(prev_conversation)
-        db.commit()
-        db.refresh(prev_conversation)
+        await db.commit()
+        await db.refresh(prev_conversation)
     
     user_message = None
-    if prev_message and prev_message.role == "user":
-        user_message = prev_message
+    new_user_message = False
+    if prev_message and prev_message["role"] == "user":
+        # Left by /prepare; the event needs the full entity.
+        result = await db.execute(
+            select(M.Message).filter_by(seq=prev_message["seq"], id=prev_message["id"])
+        )
+        user_message = result.scalars().first()
     else:
         user_message = M.Message(
-            parent_id=prev_message.id if prev_message else None,
+            parent_id=prev_message["id"] if prev_message else None,
             conversation_id=body.conversation_id,
             role="user",
             content=body.messages[-1].content,
         )
         db.add(user_message)
-        db.commit()
-        db.refresh(user_message)
-    
-    try:
-        await request.app.state.producer.send_and_wait(
-            "conversation.user.message", key=None, value=create_event(user_message.to_dict())
+        await db.flush()
+        new_user_message = True
+
+    add_event(
+        db,
+        "conversation.user.message",
+        create_event(user_message.to_dict()),
+        key=body.conversation_id,
+    )
+    await db.commit()
+    request.app.state.outbox.notify()
+    if new_user_message:
+        await history.append(
+            body.conversation_id,
+            message_row(user_message),
+            create=new_conversation,
         )
-    except Exception as e:
-        return JSONResponse(create_response(str(e)), 500)
 
     if prev_conversation.title is None or prev_conversation.title == "":
-        asyncio.create_task(set_title(db, prev_conversation, body.messages[-1].content))
+        titles.put(prev_conversation.id, body.messages[-1].content)
 
-    url = "https://api.openai.com/v1/chat/completions"
+    url = f"{OPENAI_BASE_URL}/chat/completions"
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
@@ -226,106 +461,56 @@ async def completions(
     data = {
         "model": "gpt-4o",
         "messages": [
-            {
-                "role": "developer",
-                "content": f"""
-You are Cherry, the official AI assistant for CakeStack, founded by Shane Oh.
-
-# Company & Product Context
-CakeStack is a developer-first platform that helps teams build production-ready microservices with no pain.
-Our flagship product, Microservice Sandbox, is a batteries-included starter kit featuring:
-- CQRS + Kafka for scalable, event-driven architectures
-- Multi-tenant authentication & authorization
-- PostgreSQL and Redis integrations
-- Kubernetes-ready deployments
-Optimized developer experience from day one
-We believe in production from day one—empowering developers to ship fast, maintain quality, and avoid boilerplate chaos.
-
-# Your Role
-Cherry is the knowledgeable, practical, and friendly technical partner for anyone interacting with CakeStack. You help:
-- Explain CakeStack’s architecture, features, and best practices
-- Provide hands-on technical guidance for Microservice Sandbox
-- Offer clear, concise, and actionable answers to developer questions
-- Suggest optimizations, troubleshooting steps, and deployment strategies
-- Maintain a professional yet approachable tone
-
-# Guidelines
-- Be precise & practical — no vague answers; always provide implementation-ready guidance.
-- Understand context — tailor explanations to the user’s technical level.
-- Prioritize developer experience — share best practices, not just solutions.
-- Stay up-to-date — reflect the latest capabilities and recommendations for CakeStack.
-- Be a technical partner — anticipate needs, suggest improvements, and connect dots between components.
-
-# Tone & Style
-- Professional but approachable
-- Direct, confident, and jargon-aware
-- Uses examples and code snippets when helpful
-- Encouraging, collaborative, and developer-first
-
-# User
-- The current user's information: {user.to_dict() if user else "No user data available"}
-- Greet user with the the information you have about them.
-- Use their name if possible when greeting.
-- Say "Hello, [name]!" if you have their name.
-""",
-            },
+            developer_message(user),
             *[m.model_dump() for m in body.messages],
         ],
         "stream": True,
+        # The final chunk then reports usage, including cached prompt tokens.
+        "stream_options": {"include_usage": True},
     }
 
     async def stream_generator(url: str, data: dict):
-        chunks = ""
-        async with httpx.AsyncClient(timeout=60) as client:
-            async with client.stream(
-                "POST", url, headers=headers, json=data
-            ) as response:
-                async for b in response.aiter_bytes():
-                    chunks += b.decode("utf-8")
-                    yield b
-        chunks = [
-            c.removeprefix("data: ").strip()
-            for c in chunks.split("\n\n")
-            if c.startswith("data: ")
-        ]
-        chunks = [json.loads(c) for c in chunks if c and c != "[DONE]"]
-        chunks = [c["choices"][0].get("delta").get("content") for c in chunks]
-        chunks = [c for c in chunks if c is not None]
-        content = "".join(chunks)
+        stream = ChatCompletionStream()
+        client = request.app.state.http
+        async with client.stream(
+            "POST", url, headers=headers, json=data
+        ) as response:
+            async for b in response.aiter_bytes():
+                stream.feed(b)
+                yield b
+        content = stream.content
         logger.debug(content)
-
-        assistant_message = M.Message(
-            parent_id=user_message.id,
-            conversation_id=body.conversation_id,
-            role="assistant",
-            content=content,
-        )
-        db.add(assistant_message)
-        db.commit()
-        db.refresh(assistant_message)
-
-        # Produce Kafka event after streaming response
-        try:
-            await request.app.state.producer.send_and_wait(
-                "conversation.assistant.message", key=None, value=create_event(assistant_message.to_dict())
+        prompts.record(data["messages"], stream.usage)
+
+        # The request-scoped session is released once the response starts.
+        async with SessionLocal() as db:
+            assistant_message = M.Message(
+                parent_id=user_message.id,
+                conversation_id=body.conversation_id,
+                role="assistant",
+                content=content,
+            )
+            db.add(assistant_message)
+            await db.flush()
+            add_event(
+                db,
+                "conversation.assistant.message",
+                create_event(assistant_message.to_dict()),
+                key=body.conversation_id,
             )
-        except Exception as e:
-            logger.exception("Kafka production failed: %s", e)
+            await db.commit()
+        request.app.state.outbox.notify()
+        await history.append(body.conversation_id, message_row(assistant_message))
 
-    return StreamingResponse(
-        stream_generator(url=url, data=data),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",
-        },
-    )
+    return stream_generator(url=url, data=data)
 
 
 @app.get("/list")
 async def list_conversations(
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     tokens: dict = Depends(get_tokens),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     token = tokens.get("access_token") or tokens.get("bearer_token") or None
     try:
@@ -333,17 +518,25 @@ async def list_conversations(
     except Exception as e:
         raise e
 
-    conversations = (
-        db.query(M.Conversation)
+    stmt = (
+        select(*CONVERSATION_COLUMNS)
         .filter_by(user_id=payload.sub)
-        .order_by(M.Conversation.created_at.desc())
-        .all()
+        .order_by(M.Conversation.created_at.desc(), M.Conversation.seq.desc())
+        .limit(limit + 1)
     )
+    if cursor:
+        stmt = stmt.where(
+            tuple_(M.Conversation.created_at, M.Conversation.seq)
+            < decode_cursor(cursor)
+        )
+    result = await db.execute(stmt)
+    conversations, next_cursor = paginate(result.all(), limit)
 
     return JSONResponse(
-        create_response(
+        create_page_response(
             "Conversations list retrieved successfully.",
-            [c.to_dict() for c in conversations],
+            [c._asdict() for c in conversations],
+            next_cursor,
         ),
         200,
     )
@@ -352,8 +545,10 @@ async def list_conversations(
 @app.get("/list/{conversation_id}")
 async def get_conversation(
     conversation_id: str,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     tokens: dict = Depends(get_tokens),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     token = tokens.get("access_token") or tokens.get("bearer_token") or None
     try:
@@ -361,29 +556,52 @@ async def get_conversation(
     except Exception as e:
         raise e
 
-    conversation = (
-        db.query(M.Conversation)
-        .filter_by(id=conversation_id, user_id=payload.sub)
-        .first()
+    result = await db.execute(
+        select(*CONVERSATION_COLUMNS).filter_by(
+            id=conversation_id, user_id=payload.sub
+        )
     )
+    conversation = result.first()
 
     if not conversation:
         return JSONResponse(create_response("Conversation not found.", None), 404)
 
-    messages = (
-        db.query(M.Message)
-        .filter_by(conversation_id=conversation_id)
-        .order_by(M.Message.created_at.asc())
-        .all()
-    )
+    # Pages walk backwards from the newest message, so a thread opens at
+    # its end; next_cursor leads to older messages. Each page is still
+    # returned oldest first.
+    messages = await history.history(conversation_id)
+    if messages is not None:
+        if cursor:
+            position = decode_cursor(cursor)
+            messages = [m for m in messages if (m["created_at"], m["seq"]) < position]
+        messages, next_cursor = paginate(messages[-(limit + 1) :][::-1], limit)
+        messages.reverse()
+    else:
+        stmt = (
+            select(*MESSAGE_COLUMNS)
+            .filter_by(conversation_id=conversation_id)
+            .order_by(M.Message.created_at.desc(), M.Message.seq.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            stmt = stmt.where(
+                tuple_(M.Message.created_at, M.Message.seq) < decode_cursor(cursor)
+            )
+        result = await db.execute(stmt)
+        messages, next_cursor = paginate(result.all(), limit)
+        messages = [m._asdict() for m in reversed(messages)]
+        if not cursor and not next_cursor:
+            # The first page holds the whole thread: seed the log with it.
+            await history.seed(conversation_id, messages)
 
     return JSONResponse(
-        create_response(
+        create_page_response(
             "Conversation retrieved successfully.",
             {
-                "conversation": conversation.to_dict(),
-                "messages": [m.to_dict() for m in messages],
+                "conversation": conversation._asdict(),
+                "messages": messages,
             },
+            next_cursor,
         ),
         200,
     )
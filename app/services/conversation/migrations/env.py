@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+from alembic import context
+from lib.model import Base
+from sqlalchemy import text
+
+import schemas.models  # noqa: F401 - registers tables on Base.metadata
+
+DB_SCHEMA = os.getenv("DB_SCHEMA")
+config = context.config
+
+
+def include_name(name, type_, parent_names) -> bool:
+    if type_ == "schema":
+        return name == f"msa_{DB_SCHEMA}"
+    return True
+
+
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        version_table_schema=f"msa_{DB_SCHEMA}",
+        include_schemas=True,
+        include_name=include_name,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    from lib.infra import new_async_engine
+
+    POSTGRES_HOST = os.getenv("POSTGRES_HOST")
+    POSTGRES_PORT = os.getenv("POSTGRES_PORT")
+    POSTGRES_DB = os.getenv("POSTGRES_DB")
+    POSTGRES_USER = os.getenv("POSTGRES_USER")
+    POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+    postgres_url = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    engine = new_async_engine(url=postgres_url)
+    async with engine.begin() as conn:
+        await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "msa_{DB_SCHEMA}";'))
+        await conn.run_sync(run_migrations)
+    await engine.dispose()
+
+
+# The services pass in their own connection (see lib.migrate); the alembic
+# CLI does not, so connect from the usual POSTGRES_* environment.
+connection = config.attributes.get("connection")
+if connection is not None:
+    run_migrations(connection)
+else:
+    asyncio.run(run_async_migrations())
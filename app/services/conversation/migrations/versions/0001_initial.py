@@ -0,0 +1,112 @@
+"""initial
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = f"msa_{os.getenv('DB_SCHEMA')}"
+
+
+def base_columns() -> list:
+    return [
+        sa.Column("id", sa.Text(), nullable=False),
+        sa.Column("seq", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+    ]
+
+
+def to_timestamptz(inspector, table: str) -> None:
+    # create_all-era tables have naive timestamp columns holding UTC; the
+    # models now write aware datetimes, which asyncpg rejects for those.
+    for column in inspector.get_columns(table, schema=SCHEMA):
+        if isinstance(column["type"], sa.DateTime) and not column["type"].timezone:
+            name = column["name"]
+            op.alter_column(
+                table,
+                name,
+                type_=sa.DateTime(timezone=True),
+                postgresql_using=f"\"{name}\" AT TIME ZONE 'UTC'",
+                schema=SCHEMA,
+            )
+
+
+def upgrade() -> None:
+    # Databases bootstrapped with create_all already have these tables.
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table("users", schema=SCHEMA):
+        to_timestamptz(inspector, "users")
+    else:
+        op.create_table(
+            "users",
+            sa.Column("user_id", sa.String(36), nullable=True),
+            sa.Column("user_seq", sa.Integer(), nullable=True),
+            sa.Column("user_created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("user_updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("user_deleted_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("email", sa.Text(), nullable=True),
+            sa.Column("username", sa.Text(), nullable=True),
+            sa.Column("hashed_password", sa.Text(), nullable=True),
+            sa.Column("name", sa.Text(), nullable=True),
+            sa.Column("bio", sa.Text(), nullable=True),
+            sa.Column("profile_url", sa.Text(), nullable=True),
+            sa.Column("role", sa.Text(), nullable=True),
+            sa.Column("sso_provider", sa.Text(), nullable=True),
+            sa.Column("sso_id", sa.Text(), nullable=True),
+            sa.Column("is_first_login", sa.Boolean(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("change_password_on_next_login", sa.Boolean(), nullable=True),
+            sa.Column("last_login_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column(
+                "last_password_change_at", sa.DateTime(timezone=True), nullable=True
+            ),
+            *base_columns(),
+            sa.PrimaryKeyConstraint("seq", "id"),
+            schema=SCHEMA,
+        )
+
+    if inspector.has_table("messages", schema=SCHEMA):
+        to_timestamptz(inspector, "messages")
+    else:
+        op.create_table(
+            "messages",
+            sa.Column("conversation_id", sa.Text(), nullable=False),
+            sa.Column("parent_id", sa.Text(), nullable=True),
+            sa.Column("role", sa.Text(), nullable=True),
+            sa.Column("content", sa.Text(), nullable=True),
+            *base_columns(),
+            sa.PrimaryKeyConstraint("seq", "id"),
+            schema=SCHEMA,
+        )
+
+    if inspector.has_table("conversations", schema=SCHEMA):
+        to_timestamptz(inspector, "conversations")
+    else:
+        op.create_table(
+            "conversations",
+            sa.Column("user_id", sa.Text(), nullable=True),
+            sa.Column("title", sa.Text(), nullable=True),
+            *base_columns(),
+            sa.PrimaryKeyConstraint("seq", "id"),
+            schema=SCHEMA,
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("conversations", schema=SCHEMA)
+    op.drop_table("messages", schema=SCHEMA)
+    op.drop_table("users", schema=SCHEMA)
@@ -0,0 +1,70 @@
+"""indexes for hot lookups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = f"msa_{os.getenv('DB_SCHEMA')}"
+
+
+def upgrade() -> None:
+    # Worker upserts and every completion look users up by user_id.
+    op.create_index(
+        "users_user_id_key",
+        "users",
+        ["user_id"],
+        unique=True,
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    # Thread loads and "last message" lookups filter by conversation and
+    # order by creation time.
+    op.create_index(
+        "ix_messages_conversation_id_created_at",
+        "messages",
+        ["conversation_id", "created_at"],
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    # The primary key is (seq, id), so it cannot serve lookups by id alone.
+    op.create_index(
+        "ix_conversations_id",
+        "conversations",
+        ["id"],
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    # The conversation list filters by owner, newest first.
+    op.create_index(
+        "ix_conversations_user_id_created_at",
+        "conversations",
+        ["user_id", "created_at"],
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_conversations_user_id_created_at",
+        table_name="conversations",
+        schema=SCHEMA,
+    )
+    op.drop_index("ix_conversations_id", table_name="conversations", schema=SCHEMA)
+    op.drop_index(
+        "ix_messages_conversation_id_created_at",
+        table_name="messages",
+        schema=SCHEMA,
+    )
+    op.drop_index("users_user_id_key", table_name="users", schema=SCHEMA)
@@ -0,0 +1,43 @@
+"""extend list indexes with seq for keyset pagination
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = f"msa_{os.getenv('DB_SCHEMA')}"
+
+INDEXES = {
+    "ix_messages_conversation_id_created_at": (
+        "messages",
+        ["conversation_id", "created_at"],
+    ),
+    "ix_conversations_user_id_created_at": (
+        "conversations",
+        ["user_id", "created_at"],
+    ),
+}
+
+
+def upgrade() -> None:
+    # Pages are cut on (created_at, seq); seq breaks ties between rows
+    # created in the same microsecond.
+    for name, (table, columns) in INDEXES.items():
+        op.drop_index(name, table_name=table, schema=SCHEMA)
+        op.create_index(name, table, [*columns, "seq"], schema=SCHEMA)
+
+
+def downgrade() -> None:
+    for name, (table, columns) in INDEXES.items():
+        op.drop_index(name, table_name=table, schema=SCHEMA)
+        op.create_index(name, table, columns, schema=SCHEMA)
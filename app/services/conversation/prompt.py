@@ -0,0 +1,113 @@
+import hashlib
+from logging import getLogger
+
+import orjson
+
+logger = getLogger(__name__)
+
+# Static instructions, sent byte-for-byte identically on every request so the
+# upstream prompt-prefix cache can reuse them. Anything that varies per user
+# or per request belongs in user_context(), which is appended after it.
+PREFIX = """
+You are Cherry, the official AI assistant for CakeStack, founded by Shane Oh.
+
+# Company & Product Context
+CakeStack is a developer-first platform that helps teams build production-ready microservices with no pain.
+Our flagship product, Microservice Sandbox, is a batteries-included starter kit featuring:
+- CQRS + Kafka for scalable, event-driven architectures
+- Multi-tenant authentication & authorization
+- PostgreSQL and Redis integrations
+- Kubernetes-ready deployments
+Optimized developer experience from day one
+We believe in production from day one—empowering developers to ship fast, maintain quality, and avoid boilerplate chaos.
+
+# Your Role
+Cherry is the knowledgeable, practical, and friendly technical partner for anyone interacting with CakeStack. You help:
+- Explain CakeStack’s architecture, features, and best practices
+- Provide hands-on technical guidance for Microservice Sandbox
+- Offer clear, concise, and actionable answers to developer questions
+- Suggest optimizations, troubleshooting steps, and deployment strategies
+- Maintain a professional yet approachable tone
+
+# Guidelines
+- Be precise & practical — no vague answers; always provide implementation-ready guidance.
+- Understand context — tailor explanations to the user’s technical level.
+- Prioritize developer experience — share best practices, not just solutions.
+- Stay up-to-date — reflect the latest capabilities and recommendations for CakeStack.
+- Be a technical partner — anticipate needs, suggest improvements, and connect dots between components.
+
+# Tone & Style
+- Professional but approachable
+- Direct, confident, and jargon-aware
+- Uses examples and code snippets when helpful
+- Encouraging, collaborative, and developer-first
+
+# User
+- Greet user with the information you have about them.
+- Use their name if possible when greeting.
+- Say "Hello, [name]!" if you have their name.
+- The current user's information follows.
+"""
+PREFIX_DIGEST = hashlib.sha256(PREFIX.encode()).hexdigest()[:12]
+
+# The only profile fields the model sees.
+USER_FIELDS = ("name", "username", "bio", "role")
+
+
+def user_context(user: dict | None) -> str:
+    if not user:
+        return "No user data available\n"
+    fields = {name: user[name] for name in USER_FIELDS if user.get(name)}
+    return orjson.dumps(fields).decode() + "\n"
+
+
+def developer_message(user: dict | None) -> dict:
+    return {"role": "developer", "content": PREFIX + user_context(user)}
+
+
+class PromptStats:
+    # Per-request prompt size plus the cached share of prompt tokens
+    # reported by the upstream (stream usage), to confirm prefix hits.
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_chars = 0
+        self.suffix_chars = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, messages: list[dict], usage: dict | None) -> None:
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        suffix_chars = len(messages[0]["content"]) - len(PREFIX)
+        prompt_tokens = (usage or {}).get("prompt_tokens") or 0
+        cached_tokens = (
+            ((usage or {}).get("prompt_tokens_details") or {}).get("cached_tokens")
+            or 0
+        )
+        self.requests += 1
+        self.prompt_chars += prompt_chars
+        self.suffix_chars += suffix_chars
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        logger.info(
+            f"prompt|{PREFIX_DIGEST}|{prompt_chars}|{suffix_chars}"
+            f"|{prompt_tokens}|{cached_tokens}"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "prefix_digest": PREFIX_DIGEST,
+            "prefix_chars": len(PREFIX),
+            "requests": self.requests,
+            "prompt_chars_avg": (
+                self.prompt_chars / self.requests if self.requests else 0.0
+            ),
+            "suffix_chars_avg": (
+                self.suffix_chars / self.requests if self.requests else 0.0
+            ),
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": (
+                self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+            ),
+        }
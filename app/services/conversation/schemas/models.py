@@ -1,14 +1,17 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, Text, String
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, Text, String
 
 from lib.model import BaseModel
+from lib.outbox import Outbox  # noqa: F401 - shares the service schema
 
 
 class User(BaseModel):
+    __indexes__ = (Index("users_user_id_key", "user_id", unique=True),)
+
     user_id = Column(String(36))
     user_seq = Column(Integer)
-    user_created_at = Column(DateTime)
-    user_updated_at = Column(DateTime)
-    user_deleted_at = Column(DateTime)
+    user_created_at = Column(DateTime(timezone=True))
+    user_updated_at = Column(DateTime(timezone=True))
+    user_deleted_at = Column(DateTime(timezone=True))
 
     email = Column(Text)
     username = Column(Text)
@@ -25,11 +28,20 @@ class User(BaseModel):
     is_first_login = Column(Boolean)
     is_active = Column(Boolean)
     change_password_on_next_login = Column(Boolean)
-    last_login_at = Column(DateTime)
-    last_password_change_at = Column(DateTime)
+    last_login_at = Column(DateTime(timezone=True))
+    last_password_change_at = Column(DateTime(timezone=True))
 
 
 class Message(BaseModel):
+    __indexes__ = (
+        Index(
+            "ix_messages_conversation_id_created_at",
+            "conversation_id",
+            "created_at",
+            "seq",
+        ),
+    )
+
     conversation_id = Column(Text, nullable=False)
     parent_id = Column(Text, nullable=True, default=None)
     role = Column(Text)
@@ -37,5 +49,15 @@ class Message(BaseModel):
 
 
 class Conversation(BaseModel):
+    __indexes__ = (
+        Index("ix_conversations_id", "id"),
+        Index(
+            "ix_conversations_user_id_created_at",
+            "user_id",
+            "created_at",
+            "seq",
+        ),
+    )
+
     user_id = Column(Text)
     title = Column(Text)
@@ -1,9 +1,14 @@
 import os
 import asyncio
 import logging
+import zlib
+from datetime import datetime
+from lib.cache import ProfileCache
 from lib.infra import *
-from sqlalchemy import create_engine, text
-from lib.model import Base
+from sqlalchemy import DateTime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from lib.migrate import upgrade
 import schemas.models as M
 
 logger = logging.getLogger(__name__)
@@ -15,47 +20,160 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-postgres_url = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-db = new_db_session(url=postgres_url)
-engine = create_engine(url=postgres_url)
+postgres_url = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+engine = get_async_engine(url=postgres_url, name="conversation")
+SessionLocal = get_async_sessionmaker(url=postgres_url)
 assert DB_SCHEMA
-db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "msa_{DB_SCHEMA}";'))
-db.commit()
-Base.metadata.create_all(bind=engine)
-
-
-def handler(msg) -> None:
-
-    user = db.query(M.User).filter_by(user_id=msg.value['data']['id']).first()
-    if user:
-        for key, value in msg.value['data'].items():
-            if hasattr(user, key):
-                setattr(user, key, value)
-        user.user_seq = msg.value['data']['seq']
-        user.user_created_at = msg.value['data']['created_at']
-        user.user_updated_at = msg.value['data']['updated_at']
-        user.user_deleted_at = msg.value['data']['deleted_at']
-        db.commit()
-    else:
-        user = M.User(
-            **msg.value['data'],
-            user_id=msg.value['data']['id'],
-            user_seq=msg.value['data']['seq'],
-            user_created_at=msg.value['data']['created_at'],
-            user_updated_at=msg.value['data']['updated_at'],
-            user_deleted_at=msg.value['data']['deleted_at'],
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "migrations")
+
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = os.getenv("REDIS_PORT")
+redis = new_async_redis(host=REDIS_HOST, port=REDIS_PORT)
+# Shared with the API replicas, which read through it.
+profiles = ProfileCache(redis, namespace="conversation:profile")
+
+# Infrastructure failures stop the worker without committing offsets.
+TRANSIENT_ERRORS = (InterfaceError, OperationalError, OSError)
+
+
+async def bootstrap() -> None:
+    await upgrade(engine, MIGRATIONS)
+
+
+def parse_user(data: dict) -> dict:
+    # Events carry JSON-encoded timestamps; asyncpg only binds datetimes.
+    columns = M.User.__table__.columns
+    return {
+        key: (
+            datetime.fromisoformat(value)
+            if isinstance(value, str) and isinstance(columns[key].type, DateTime)
+            else value
         )
-        db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+        for key, value in data.items()
+        if key in columns
+    }
+
+
+def to_row(data: dict) -> dict:
+    data = parse_user(data)
+    return {
+        **data,
+        "user_id": data["id"],
+        "user_seq": data["seq"],
+        "user_created_at": data["created_at"],
+        "user_updated_at": data["updated_at"],
+        "user_deleted_at": data["deleted_at"],
+    }
+
+
+async def upsert_users(db, records) -> list[str]:
+    # Coalesce to the newest snapshot per user, then write the whole batch
+    # with a single INSERT ... ON CONFLICT DO UPDATE.
+    rows = {}
+    for msg in records:
+        row = to_row(msg.value["data"])
+        prev = rows.get(row["user_id"])
+        if prev is None or prev["user_updated_at"] <= row["user_updated_at"]:
+            rows[row["user_id"]] = row
+
+    keys = set().union(*rows.values())
+    stmt = insert(M.User).values(
+        [{key: row.get(key) for key in keys} for row in rows.values()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[M.User.user_id],
+        set_={key: stmt.excluded[key] for key in keys if key != "user_id"},
+        # Replayed or reordered events never roll a user back.
+        where=M.User.user_updated_at <= stmt.excluded.user_updated_at,
+    )
+    await db.execute(stmt)
+    return list(rows)
 
 
 handlers: dict[str, callable] = {
-    "auth.user.registered": handler,
-    "auth.user.updated": handler,
+    "auth.user.registered": upsert_users,
+    "auth.user.updated": upsert_users,
 }
 
+WORKER_BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", 500))
+WORKER_BATCH_TIMEOUT_MS = int(os.getenv("WORKER_BATCH_TIMEOUT_MS", 1000))
+WORKER_MAX_IN_FLIGHT = int(os.getenv("WORKER_MAX_IN_FLIGHT", 4))
+
+
+async def run_handler(handler, records) -> None:
+    # Handlers return the ids of the users they wrote; their cached
+    # profiles are dropped once the transaction has committed.
+    async with SessionLocal() as db, db.begin():
+        user_ids = await handler(db, records)
+    try:
+        await profiles.invalidate(*user_ids)
+    except Exception as e:
+        # Entries still expire after PROFILE_CACHE_TTL.
+        logger.warning(f"kafka:conversation:consumer:cache|{e}")
+
+
+async def process(records) -> None:
+    groups: dict = {}
+    for msg in records:
+        handler = handlers.get(msg.topic)
+        if handler is None:
+            logger.error(
+                "kafka:conversation:consumer:{'message':'Handler not found.'}"
+            )
+            continue
+        groups.setdefault(handler, []).append(msg)
+
+    for handler, msgs in groups.items():
+        try:
+            await run_handler(handler, msgs)
+            continue
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"kafka:conversation:consumer:batch|{len(msgs)}|{e}")
+
+        # Retry one by one so a single bad event does not hold up the rest.
+        for msg in msgs:
+            try:
+                await run_handler(handler, [msg])
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"kafka:conversation:consumer:{msg.topic}|{msg.offset}|{e}"
+                )
+
+
+def lanes(records, n: int) -> list[list]:
+    # Records with the same key (entity id) land in the same lane, in offset
+    # order, so each entity's events are applied in sequence. Ordering only
+    # has to hold within a batch, since batches run one after another; crc32
+    # rather than hash() keeps the split the same across processes. Keyless
+    # records belong to no entity and are spread by offset.
+    lanes = [[] for _ in range(n)]
+    for msg in records:
+        slot = zlib.crc32(msg.key.encode()) if msg.key is not None else msg.offset
+        lanes[slot % n].append(msg)
+    return [lane for lane in lanes if lane]
+
+
+async def dispatch(batches: dict) -> None:
+    # Partitions are processed concurrently, each split into at most
+    # WORKER_MAX_IN_FLIGHT lanes; every lane is its own transaction.
+    tasks = [
+        asyncio.create_task(process(lane))
+        for msgs in batches.values()
+        for lane in lanes(msgs, WORKER_MAX_IN_FLIGHT)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # If a lane fails, the rest are cancelled and awaited here, so the
+        # consumer is not stopped and the pool disposed under them.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 
 async def consume() -> None:
     from lib.infra import new_kafka_consumer
@@ -65,32 +183,32 @@ async def consume() -> None:
         *handlers.keys(),
         group_id="conversation-service",
         bootstrap_servers=[KAFKA_BROKER_URL],
+        enable_auto_commit=False,
     )
 
+    await bootstrap()
     await consumer.start()
     logger.info("kafka:conversation:consumer:{'message':'Started.'}")
 
     try:
-        async for msg in consumer:
-            topic = msg.topic
-            handler = handlers.get(topic)
-            logger.info(
-                f"kafka:conversation:consumer:{topic}|{msg.value}"
+        while True:
+            batches = await consumer.getmany(
+                timeout_ms=WORKER_BATCH_TIMEOUT_MS, max_records=WORKER_BATCH_SIZE
             )
-            if handler is None:
-                logger.error(
-                    "kafka:conversation:consumer:{'message':'Handler not found.'}"
-                )
+            count = sum(len(msgs) for msgs in batches.values())
+            if not count:
                 continue
 
-            try:
-                handler(msg)
-            except Exception as e:
-                logger.error(
-                    f"kafka:conversation:consumer:{'message':'Error processing message.', 'error': str(e)}"
-                )
+            logger.info(f"kafka:conversation:consumer:batch|{len(batches)}|{count}")
+            await dispatch(batches)
+            # Offsets only move once the batch is durably written; a crash
+            # before this point replays the batch, which the upsert tolerates.
+            await consumer.commit()
     finally:
         await consumer.stop()
+        logger.info(f"kafka:conversation:consumer:pool|{get_pool_stats()}")
+        await dispose_async_engines()
+        await redis.aclose()
         logger.info("kafka:conversation:consumer:{'message':'Stopped.'}")
 
 
@@ -33,6 +33,13 @@ export default function Chat({ messages: initialMessages = [], conversationId: i
 
   const autoKickRef = useRef<string | null>(null);
 
+  // History is paged newest-first: the latest page is loaded up front and
+  // older pages are prepended on demand.
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Distance from the bottom to keep while older messages are prepended.
+  const anchorRef = useRef<number | null>(null);
+
   const scrollRef = useRef<HTMLDivElement | null>(null);
   const inputRef = useRef<HTMLTextAreaElement | null>(null);
 
@@ -44,6 +51,13 @@ export default function Chat({ messages: initialMessages = [], conversationId: i
   useEffect(() => {
     const el = scrollRef.current;
     if (!el) return;
+    const anchor = anchorRef.current;
+    if (anchor !== null) {
+      // Older messages went in above: keep the view where it was.
+      anchorRef.current = null;
+      el.scrollTop = el.scrollHeight - anchor;
+      return;
+    }
     const top = el.scrollHeight;
     if (pending) {
       el.scrollTop = top; // fast during streaming
@@ -149,6 +163,48 @@ export default function Chat({ messages: initialMessages = [], conversationId: i
     }
   }, []);
 
+  const fetchPage = useCallback(async (cid: string, after: string | null) => {
+    const res = await getConversation(cid, after);
+    if (!res.ok) throw new Error(`HTTP ${res.status} ${res.statusText}`);
+    const page = await res.json();
+    return {
+      messages: page.data.messages as Message[],
+      next: (page.next_cursor ?? null) as string | null,
+    };
+  }, []);
+
+  // The whole history is resent with each completion, so everything older
+  // than the loaded pages is fetched before sending.
+  const fetchOlder = useCallback(
+    async (cid: string, after: string | null) => {
+      const older: Message[] = [];
+      while (after) {
+        const page = await fetchPage(cid, after);
+        older.unshift(...page.messages);
+        after = page.next;
+      }
+      return older;
+    },
+    [fetchPage]
+  );
+
+  async function loadMore() {
+    const cid = conversationId;
+    if (!cid || !cursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(cid, cursor);
+      const el = scrollRef.current;
+      if (el) anchorRef.current = el.scrollHeight - el.scrollTop;
+      setMessages((prev) => [...page.messages, ...prev]);
+      setCursor(page.next);
+    } catch (err) {
+      console.error("load error:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   // Continue existing conversation without appending a new user message
   const continueConversation = useCallback(
     async (history: Message[]) => {
@@ -176,18 +232,22 @@ export default function Chat({ messages: initialMessages = [], conversationId: i
           if (!cancelled) setMessages(initialMessages ?? []);
           return;
         }
-        let loaded: Message[] = []
+        let loaded: Message[] = [];
+        let next: string | null = null;
         if (!isNew) {
-          const res = await getConversation(cid);
-          loaded = (await res.json()).data.messages;
+          const page = await fetchPage(cid, null);
+          loaded = page.messages;
+          next = page.next;
         }
         const merged = [...loaded, ...(initialMessages ?? [])];
-        if (!cancelled) setMessages(merged);
+        if (cancelled) return;
+        setCursor(next);
+        setMessages(merged);
 
         const last = merged[merged.length - 1];
-        if (!cancelled && last && last.role === "user" && autoKickRef.current !== cid) {
+        if (last && last.role === "user" && autoKickRef.current !== cid) {
           autoKickRef.current = cid;
-          await continueConversation(merged);
+          await continueConversation([...(await fetchOlder(cid, next)), ...merged]);
         }
       } catch {
         // Ignore fetch/parse errors here; UI will behave as new chat
@@ -198,7 +258,7 @@ export default function Chat({ messages: initialMessages = [], conversationId: i
     return () => {
       cancelled = true;
     };
-  }, [conversationId, initialMessages, continueConversation, bumpVersion, isNew]);
+  }, [conversationId, initialMessages, continueConversation, bumpVersion, isNew, fetchPage, fetchOlder]);
 
   // Send a new user message (creates a conversation id if needed)
   async function sendMessage(content: string) {
@@ -215,7 +275,13 @@ export default function Chat({ messages: initialMessages = [], conversationId: i
     setMessages((prev) => [...prev, userMsg]);
 
     try {
-      const history = [...messages, userMsg];
+      let loaded = messages;
+      if (cursor) {
+        loaded = [...(await fetchOlder(cid, cursor)), ...messages];
+        setMessages([...loaded, userMsg]);
+        setCursor(null);
+      }
+      const history = [...loaded, userMsg];
       await postAndStream(cid, history);
     } catch (err) {
       console.error("streaming error:", err);
@@ -233,6 +299,18 @@ export default function Chat({ messages: initialMessages = [], conversationId: i
         {messages.length === 0 && (
           <div className="text-sm text-black/60">Start a conversation.</div>
         )}
+        {cursor && !pending && (
+          <div className="flex justify-center">
+            <button
+              type="button"
+              onClick={() => void loadMore()}
+              disabled={loadingMore}
+              className="rounded-xl border border-black/10 px-3 py-1 text-xs text-black/60 shadow hover:bg-black/5 disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load older messages"}
+            </button>
+          </div>
+        )}
         {messages.map((m) => (
           <Bubble key={m.id} role={m.role}>
             {m.content}
@@ -36,20 +36,30 @@ export default function ConversationList({
   const { version } = useChatListContext();
   const router = useRouter();
 
-  const load = useCallback(async () => {
+  // Only the first page is fetched up front; further pages on demand.
+  const [cursor, setCursor] = useState<string | null>(null);
+
+  const fetchPage = useCallback(async (after: string | null) => {
     setLoading(true);
     setError(null);
-    const res = await listConversations();
-    if (!res.ok) {
-      throw new Error(`Failed to load conversations: ${res.statusText}`);
+    try {
+      const res = await listConversations(after);
+      if (!res.ok) {
+        throw new Error(`Failed to load conversations: ${res.statusText}`);
+      }
+      const page = await res.json();
+      setConversations((prev) => (after ? [...prev, ...page.data] : page.data));
+      setCursor(page.next_cursor ?? null);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : String(err));
+    } finally {
+      setLoading(false);
     }
-    const list: Conversation[] = (await res.json()).data;
-    setConversations(list);
   }, []);
 
   useEffect(() => {
-    load();
-  }, [load, version]);
+    fetchPage(null);
+  }, [fetchPage, version]);
 
   return (
     <nav
@@ -87,6 +97,16 @@ export default function ConversationList({
           );
         })}
       </ul>
+      {cursor && (
+        <button
+          type="button"
+          onClick={() => fetchPage(cursor)}
+          disabled={loading}
+          className="mt-1 w-full rounded-md px-3 py-2 text-left text-sm text-black/60 cursor-pointer hover:bg-black/5 disabled:opacity-50"
+        >
+          {loading ? "Loading..." : "Load more"}
+        </button>
+      )}
     </nav>
   );
 }
\ No newline at end of file
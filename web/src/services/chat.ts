@@ -1,8 +1,16 @@
 import type { Message } from "@/types";
 import { API_URL } from "@/config";
 
-export async function listConversations() {
-  return await fetch(`${API_URL}/api/v1/conversation/list`, {
+function pageQuery(cursor?: string | null, limit?: number) {
+  const params = new URLSearchParams();
+  if (cursor) params.set("cursor", cursor);
+  if (limit) params.set("limit", String(limit));
+  const query = params.toString();
+  return query ? `?${query}` : "";
+}
+
+export async function listConversations(cursor?: string | null, limit?: number) {
+  return await fetch(`${API_URL}/api/v1/conversation/list${pageQuery(cursor, limit)}`, {
     method: "GET",
     headers: {
       "Content-Type": "application/json",
@@ -11,8 +19,12 @@ export async function listConversations() {
   });
 }
 
-export async function getConversation(conversationId: string) {
-  return await fetch(`${API_URL}/api/v1/conversation/list/${conversationId}`, {
+export async function getConversation(
+  conversationId: string,
+  cursor?: string | null,
+  limit?: number
+) {
+  return await fetch(`${API_URL}/api/v1/conversation/list/${conversationId}${pageQuery(cursor, limit)}`, {
     method: "GET",
     headers: {
       "Content-Type": "application/json",